@@ -0,0 +1,109 @@
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import tempfile
+import time
+
+import numpy as np
+
+from main import (POSITIONS, build_workbook, load_platform_rankings, load_projections, parse_team_rankings,
+                  ranking_table, rank_players, score_players, write_csv)
+from name_matching import NameIndex
+from synthetic_data import generate
+
+# Stages timed, in pipeline order
+STAGES = ["parse_platform_rankings", "parse_csv", "scoring", "ranking", "csv", "workbook"]
+
+
+def run_pipeline(work_dir, reader="csv"):
+    # One run of the pipeline over the data in work_dir, returns {stage: seconds}
+    times = {}
+
+    def timed(stage, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        times[stage] = time.perf_counter() - start
+        return result
+
+    # Names missing from the rankings are printed while parsing, keep them out of the results
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        platform_name, platform_rankings = timed("parse_platform_rankings", load_platform_rankings,
+                                                 os.path.join(work_dir, "draft_platform_rankings"))
+        players = timed("parse_csv", load_projections, os.path.join(work_dir, "fp_data"), platform_rankings,
+                        name_index=NameIndex(platform_rankings), reader=reader)
+    # Freshly parsed players have no cached scores, so this is the whole pool scored from scratch
+    timed("scoring", score_players, [player for position in POSITIONS for player in players[position].values()])
+    rankings = timed("ranking", rank_players, players, platform_name)
+
+    def write_csvs():
+        for position, (headers, rows) in rankings.items():
+            write_csv(os.path.join(work_dir, "output", f"{position}.csv"), headers, rows)
+    timed("csv", write_csvs)
+
+    def write_workbook():
+        tables = {position: ranking_table(headers, rows) for position, (headers, rows) in rankings.items()}
+        build_workbook(tables, parse_team_rankings(os.path.join(work_dir, "notes", "teams.csv")),
+                       os.path.join(work_dir, "DraftSheet.xlsm"))
+    timed("workbook", write_workbook)
+    return times
+
+
+def benchmark(players_per_position, repeat=3, seed=0, reader="csv"):
+    # Best time of every stage over `repeat` runs on made up data of the given size
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.makedirs(os.path.join(work_dir, "output"))
+        generate(work_dir, players_per_position, seed)
+        runs = [run_pipeline(work_dir, reader) for _ in range(repeat)]
+    return {stage: min(run[stage] for run in runs) for stage in STAGES}
+
+
+def load_results(file_path):
+    try:
+        with open(file_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time every stage of the pipeline on made up data")
+    parser.add_argument("--players", type=int, nargs="+", default=[150, 1000],
+                        help="players per position, one benchmark per size (default: 150 1000)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size, the best time is kept (default: 3)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reader", choices=["csv", "pandas", "npy"], default="csv",
+                        help="how projection files are read, see main.py --reader (default: csv)")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="JSON file the results are added to (default: benchmark_results.json)")
+    args = parser.parse_args()
+
+    results = load_results(args.output)
+    for players_per_position in args.players:
+        stages = benchmark(players_per_position, args.repeat, args.seed, args.reader)
+        # Compare against the last recorded run of the same size
+        previous = next((result["stages"] for result in reversed(results)
+                         if result["players_per_position"] == players_per_position and result["seed"] == args.seed
+                         and result.get("reader", "csv") == args.reader),
+                        None)
+        print(f"{players_per_position} players per position")
+        for stage in STAGES:
+            change = ""
+            if previous is not None and previous.get(stage):
+                change = f" ({(stages[stage] / previous[stage] - 1) * 100:+.0f}%)"
+            print(f"  {stage:<24}{stages[stage]:9.3f}s{change}")
+        results.append({
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "players_per_position": players_per_position,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "reader": args.reader,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "stages": stages
+        })
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
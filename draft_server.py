@@ -0,0 +1,352 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+from urllib.parse import parse_qs, urlsplit
+
+from draft_session import DraftSession
+from main import NameIndex, load_platform_rankings, load_projections, pool_limits, rank_players
+from name_matching import normalize_name
+
+# Magic value from the WebSocket spec (RFC 6455) used to answer the opening handshake
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Most rows a single page of a sheet can have
+MAX_PAGE_SIZE = 500
+
+# A client that falls this many messages behind is disconnected instead of slowing everyone down
+CLIENT_QUEUE_SIZE = 100
+
+# Largest request body or WebSocket message accepted, a pick is well under 1 KB
+MAX_BODY_SIZE = 64 * 1024
+
+# Most responses kept between picks, every distinct filter or page is a separate one
+RESPONSE_CACHE_SIZE = 256
+
+BOARD_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Draft Board</title>
+<style>
+body { font-family: sans-serif; font-size: 14px; }
+td, th { padding: 2px 8px; text-align: left; }
+tr.drafted { color: gray; text-decoration: line-through; font-weight: normal; }
+tr { font-weight: bold; }
+</style>
+</head>
+<body>
+<select id="sheet"></select>
+<table><thead id="head"></thead><tbody id="rows"></tbody></table>
+<script>
+const sheet = document.getElementById("sheet");
+async function load() {
+    const response = await fetch(`/api/sheets/${sheet.value}?limit=500`);
+    const data = await response.json();
+    document.getElementById("head").innerHTML =
+        "<tr>" + data.headers.map(h => `<th>${h}</th>`).join("") + "</tr>";
+    document.getElementById("rows").innerHTML = data.rows.map(row =>
+        `<tr class="${row.Drafted ? "drafted" : ""}">` +
+        data.headers.map(h => `<td>${row[h]}</td>`).join("") + "</tr>").join("");
+}
+fetch("/api/sheets").then(r => r.json()).then(data => {
+    sheet.innerHTML = data.sheets.map(s => `<option>${s.name}</option>`).join("");
+    sheet.value = "Overall";
+    sheet.onchange = load;
+    load();
+});
+const socket = new WebSocket(`ws://${location.host}/ws`);
+socket.onmessage = load;
+</script>
+</body>
+</html>
+"""
+
+
+class DraftBoard:
+    # The scored sheets plus the live draft, held in memory for every client to share
+    # Rankings are computed once at startup, requests only filter and page through them,
+    # and finished responses are cached until the next pick changes them
+    def __init__(self, players, platform_name):
+        self.session = DraftSession(players)
+        self.sheets = {}  # sheet name : (headers, rows as dicts)
+        for position, (headers, rows) in rank_players(players, platform_name).items():
+            self.sheets[position] = (headers, [
+                dict(zip(headers, [round(value, 1) if isinstance(value, float) else value for value in row]))
+                for row in rows])
+        self.clients = set()  # a queue of outgoing messages per connected WebSocket
+        self.version = 0  # goes up with every pick, so cached responses know they are stale
+        self.response_cache = {}  # (path, query) : (version, body), oldest first
+
+    def _drafted(self, sheet, row):
+        return self.session.is_drafted(row["Name"], row.get("Pos.", sheet))
+
+    def sheet_page(self, sheet, query):
+        # One page of a sheet, optionally filtered by position, team, name or availability
+        headers, rows = self.sheets[sheet]
+        position = query.get("position")
+        team = query.get("team")
+        name = normalize_name(query["name"]) if "name" in query else None
+        available = query.get("available") in ("1", "true")
+        offset = max(int(query.get("offset", 0)), 0)
+        limit = min(max(int(query.get("limit", 50)), 0), MAX_PAGE_SIZE)
+
+        matching = []
+        for row in rows:
+            if position is not None and row.get("Pos.", sheet) != position:
+                continue
+            if team is not None and row["Team"] != team:
+                continue
+            if name is not None and name not in normalize_name(row["Name"]):
+                continue
+            drafted = self._drafted(sheet, row)
+            if available and drafted:
+                continue
+            matching.append({**row, "Drafted": drafted})
+        return {
+            "sheet": sheet,
+            "headers": headers,
+            "total": len(matching),
+            "offset": offset,
+            "rows": matching[offset:offset + limit]
+        }
+
+    def best_available(self, query):
+        n = min(max(int(query.get("n", 10)), 0), MAX_PAGE_SIZE)
+        return {"players": [self._player_json(player, relative)
+                            for player, relative in self.session.best_available(n, query.get("position"))]}
+
+    @staticmethod
+    def _player_json(player, relative):
+        low, avg, high, range_ = relative
+        return {"Name": player.name, "Pos.": player.position, "Team": player.team,
+                "Low": round(low, 1), "Avg": round(avg, 1), "High": round(high, 1), "Range": round(range_, 1)}
+
+    def state(self):
+        return {
+            "picks": [{"Name": player.name, "Pos.": player.position} for player in self.session.picks],
+            "baselines": {position: None if player is None else player.name
+                          for position, player in self.session.baseline_players.items()}
+        }
+
+    def cached(self, key, make):
+        # Serialized response, reused until the next pick
+        version, body = self.response_cache.get(key, (None, None))
+        if version != self.version:
+            body = json.dumps(make()).encode()
+            self.response_cache.pop(key, None)
+            if len(self.response_cache) >= RESPONSE_CACHE_SIZE:
+                # Forget the oldest response, dicts keep their insertion order
+                del self.response_cache[next(iter(self.response_cache))]
+            self.response_cache[key] = (self.version, body)
+        return body
+
+    def record(self, name, position=None, undo=False):
+        # Record (or take back) a pick and tell every client what changed
+        player = (self.session.undo if undo else self.session.pick)(name, position)
+        self.version += 1
+        self.response_cache.clear()
+        self.broadcast({
+            "type": "undo" if undo else "pick",
+            "picks": len(self.session.picks),
+            "player": {"Name": player.name, "Pos.": player.position, "Team": player.team},
+            # Only the baseline of the player's own position can have moved
+            "baseline": {player.position: None if self.session.baseline_players[player.position] is None
+                         else self.session.baseline_players[player.position].name}
+        })
+        return player
+
+    def broadcast(self, message):
+        frame = websocket_frame(json.dumps(message).encode())
+        for queue in list(self.clients):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Too far behind, its connection closes when it reaches the None
+                self.clients.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+
+def websocket_frame(payload, opcode=0x1):
+    # A single unmasked frame, as sent by a server
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", len(payload))
+    else:
+        header += bytes([127]) + struct.pack("!Q", len(payload))
+    return header + payload
+
+
+async def read_websocket_frame(reader):
+    # Returns (opcode, payload) of the next frame from a client, client frames are always masked
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_BODY_SIZE:
+        raise ValueError(f"WebSocket message of {length} bytes is too large")
+    mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+    payload = await reader.readexactly(length)
+    return first & 0x0F, bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+class DraftServer:
+    # Plain asyncio HTTP/1.1 and WebSocket server for a DraftBoard, no dependencies beyond the standard library
+    def __init__(self, board):
+        self.board = board
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+            try:
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                length = int(headers.get("content-length", 0))
+                if length < 0:
+                    raise ValueError
+            except ValueError:
+                await self.respond(writer, *self.error("400 Bad Request",
+                                                       "Malformed request line or Content-Length"))
+                return
+            if length > MAX_BODY_SIZE:
+                await self.respond(writer, *self.error("413 Payload Too Large",
+                                                       f"Request bodies can be at most {MAX_BODY_SIZE} bytes"))
+                return
+            body = await reader.readexactly(length)
+
+            url = urlsplit(target)
+            if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                if "sec-websocket-key" not in headers:
+                    await self.respond(writer, *self.error("400 Bad Request", "Missing Sec-WebSocket-Key header"))
+                    return
+                await self.websocket(reader, writer, headers)
+                return
+            await self.respond(writer, *self.route(method, url.path,
+                                                   {k: v[-1] for k, v in parse_qs(url.query).items()},
+                                                   url.query, body))
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def respond(writer, status, content_type, response):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(response)}\r\nConnection: close\r\n\r\n".encode() + response)
+        await writer.drain()
+
+    def route(self, method, path, query, raw_query, body):
+        board = self.board
+        try:
+            if method == "GET" and path == "/":
+                return "200 OK", "text/html; charset=utf-8", BOARD_PAGE.encode()
+            if method == "GET" and path == "/api/sheets":
+                return self.json(board.cached(("sheets", ""), lambda: {"sheets": [
+                    {"name": name, "headers": headers, "rows": len(rows)}
+                    for name, (headers, rows) in sorted(board.sheets.items())]}))
+            if method == "GET" and path.startswith("/api/sheets/"):
+                sheet = path[len("/api/sheets/"):]
+                if sheet not in board.sheets:
+                    return self.error("404 Not Found", f"No sheet named {sheet}")
+                return self.json(board.cached((path, raw_query), lambda: board.sheet_page(sheet, query)))
+            if method == "GET" and path == "/api/best":
+                return self.json(board.cached((path, raw_query), lambda: board.best_available(query)))
+            if method == "GET" and path == "/api/state":
+                return self.json(board.cached((path, ""), board.state))
+            if method == "POST" and path in ("/api/picks", "/api/undo"):
+                try:
+                    pick = json.loads(body or b"{}")
+                except ValueError:
+                    return self.error("400 Bad Request", "The body isn't valid JSON")
+                if not isinstance(pick, dict) or not isinstance(pick.get("name"), str):
+                    return self.error("400 Bad Request", 'Expected a JSON object with the player\'s "name"')
+                if not isinstance(pick.get("position"), (str, type(None))):
+                    return self.error("400 Bad Request", '"position" should be a position like "RB"')
+                player = board.record(pick["name"], pick.get("position"), undo=path == "/api/undo")
+                return self.json(json.dumps({"Name": player.name, "Pos.": player.position}).encode())
+        except KeyError as e:
+            return self.error("404 Not Found", e.args[0])
+        except ValueError as e:
+            return self.error("400 Bad Request", str(e))
+        return self.error("404 Not Found", f"Nothing at {method} {path}")
+
+    @staticmethod
+    def json(body):
+        return "200 OK", "application/json", body
+
+    @staticmethod
+    def error(status, message):
+        return status, "application/json", json.dumps({"error": message}).encode()
+
+    async def websocket(self, reader, writer, headers):
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        await writer.drain()
+
+        # Every client gets its own queue, so one slow client doesn't hold up a broadcast
+        queue = asyncio.Queue(CLIENT_QUEUE_SIZE)
+        self.board.clients.add(queue)
+        sender = asyncio.create_task(self._send(queue, writer))
+        try:
+            while True:
+                opcode, payload = await read_websocket_frame(reader)
+                if opcode == 0x8:  # close
+                    break
+                if opcode == 0x9:  # ping
+                    queue.put_nowait(websocket_frame(payload, 0xA))
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.QueueFull, ValueError):
+            pass
+        finally:
+            self.board.clients.discard(queue)
+            sender.cancel()
+
+    @staticmethod
+    async def _send(queue, writer):
+        try:
+            while (frame := await queue.get()) is not None:
+                writer.write(frame)
+                await writer.drain()
+            writer.write(websocket_frame(b"", 0x8))
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def start_server(board, host="127.0.0.1", port=0):
+    # Listening asyncio server for the board, port 0 picks a free port (see server.sockets)
+    return await asyncio.start_server(DraftServer(board).handle, host, port)
+
+
+async def serve(board, host, port):
+    server = await start_server(board, host, port)
+    print(f"Draft board running at http://{host}:{port}/")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the draft sheet to everyone in the draft room")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    platform_name, platform_rankings = load_platform_rankings("draft_platform_rankings")
+    players = load_projections("fp_data", platform_rankings, pool_limits(), NameIndex(platform_rankings))
+    try:
+        asyncio.run(serve(DraftBoard(players, platform_name), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
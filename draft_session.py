@@ -0,0 +1,194 @@
+import heapq
+
+from main import BASELINE, POSITIONS, PPR, get_baseline_projections, score_players
+
+
+class RemainingIndex:
+    # Fenwick tree over a fixed list of players, counting which of them haven't been drafted
+    # Marking a player drafted, counting the remaining players ahead of one, and finding the
+    # k-th remaining player are all O(log n), so the sorted order never has to be rebuilt
+    def __init__(self, n):
+        self.n = n
+        self.tree = [0] * (n + 1)
+        # Every player starts out remaining
+        for i in range(1, n + 1):
+            self.tree[i] += 1
+            parent = i + (i & -i)
+            if parent <= n:
+                self.tree[parent] += self.tree[i]
+        self.top_bit = 1 << n.bit_length() if n else 0
+
+    def add(self, i, delta):
+        i += 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def count_before(self, i):
+        # Number of remaining players at indexes [0, i)
+        count = 0
+        while i > 0:
+            count += self.tree[i]
+            i -= i & -i
+        return count
+
+    def find(self, k):
+        # Index of the k-th (0-based) remaining player, or None if fewer remain
+        i = 0
+        bit = self.top_bit
+        while bit:
+            if i + bit <= self.n and self.tree[i + bit] <= k:
+                i += bit
+                k -= self.tree[i]
+            bit >>= 1
+        return i if i < self.n else None
+
+    def next_remaining(self, i):
+        # First remaining index at or after i
+        return self.find(self.count_before(i))
+
+
+class DraftSession:
+    # Keeps the rankings from main.py up to date while a draft is going on
+    # Every position keeps its players sorted by average projection for the whole draft,
+    # a pick only flips the player in that position's RemainingIndex and moves the baseline
+    # The baseline player of a position is the best player expected to be left once `baseline`
+    # players of that position are gone, i.e. the (baseline - drafted)-th best one still available
+    def __init__(self, players, scoring=PPR, baseline=BASELINE, positions=POSITIONS):
+        self.positions = [position for position in positions if position in baseline]
+        self.baseline = baseline
+        self.scores = score_players((player for position in self.positions for player in players[position].values()),
+                                    scoring)
+
+        self.sorted_players = {}  # position : players, best average projection first
+        self.remaining = {}  # position : RemainingIndex over sorted_players
+        self.drafted_count = {}  # position : number of players drafted
+        self.index = {}  # player name : [(position, index in sorted_players)]
+        self.picks = []  # drafted players, in order
+        for position in self.positions:
+            self.sorted_players[position] = sorted(players[position].values(), key=lambda P: self.scores[P][1],
+                                                   reverse=True)
+            self.remaining[position] = RemainingIndex(len(self.sorted_players[position]))
+            self.drafted_count[position] = 0
+            for i, player in enumerate(self.sorted_players[position]):
+                self.index.setdefault(player.name, []).append((position, i))
+
+        self.baseline_players = {position: self._find_baseline(position) for position in self.positions}
+
+    def _find_baseline(self, position):
+        remaining = self.remaining[position]
+        left = remaining.count_before(remaining.n)
+        if left == 0:
+            return None
+        # Once too few are left, the worst player still available is the baseline
+        k = max(self.baseline[position] - self.drafted_count[position], 0)
+        return self.sorted_players[position][remaining.find(min(k, left - 1))]
+
+    def _locate(self, name, position=None):
+        entries = [entry for entry in self.index.get(name, []) if position is None or entry[0] == position]
+        if not entries:
+            raise KeyError(f"{name} is not in the draft pool")
+        if len(entries) > 1:
+            raise KeyError(f"More than one {name} in the draft pool, give the position as well")
+        return entries[0]
+
+    def is_drafted(self, name, position=None):
+        position, i = self._locate(name, position)
+        remaining = self.remaining[position]
+        return remaining.count_before(i + 1) == remaining.count_before(i)
+
+    def pick(self, name, position=None):
+        # Record a player as drafted, returns the player
+        position, i = self._locate(name, position)
+        if self.is_drafted(name, position):
+            raise ValueError(f"{name} has already been drafted")
+        player = self.sorted_players[position][i]
+        self.remaining[position].add(i, -1)
+        self.drafted_count[position] += 1
+        self.baseline_players[position] = self._find_baseline(position)
+        self.picks.append(player)
+        return player
+
+    def undo(self, name, position=None):
+        # Put a drafted player back, like clicking the draft button on the sheet a second time
+        position, i = self._locate(name, position)
+        if not self.is_drafted(name, position):
+            raise ValueError(f"{name} hasn't been drafted")
+        player = self.sorted_players[position][i]
+        self.remaining[position].add(i, 1)
+        self.drafted_count[position] -= 1
+        self.baseline_players[position] = self._find_baseline(position)
+        self.picks.remove(player)
+        return player
+
+    def relative(self, player):
+        # (low, avg, high, range) relative to the current baseline player of the player's position
+        baseline_player = self.baseline_players[player.position]
+        return get_baseline_projections(self.scores[player], self.scores[baseline_player])
+
+    def _iter_position(self, position):
+        remaining = self.remaining[position]
+        i = remaining.next_remaining(0)
+        while i is not None:
+            yield self.sorted_players[position][i]
+            i = remaining.next_remaining(i + 1)
+
+    def best_available(self, n=10, position=None):
+        # Up to n undrafted players with their relative projections, best first
+        # Without a position this is the Overall order: every position is already sorted, and all of a
+        # position's players move by the same amount when its baseline moves, so merging the positions
+        # by value over their baseline gives the Overall order without sorting anything
+        if position is not None:
+            players = []
+            for player in self._iter_position(position):
+                if len(players) == n:
+                    break
+                players.append((player, self.relative(player)))
+            return players
+
+        offsets = {position: self.scores[self.baseline_players[position]][1]
+                   for position in self.positions if self.baseline_players[position] is not None}
+        iterators = {position: self._iter_position(position) for position in offsets}
+        heap = []
+        # Ties go to the position listed first
+        for order, position in enumerate(self.positions):
+            if position not in offsets:
+                continue
+            player = next(iterators[position], None)
+            if player is not None:
+                heap.append((offsets[position] - self.scores[player][1], order, position, player))
+        heapq.heapify(heap)
+
+        players = []
+        while heap and len(players) < n:
+            _, order, position, player = heapq.heappop(heap)
+            players.append((player, self.relative(player)))
+            player = next(iterators[position], None)
+            if player is not None:
+                heapq.heappush(heap, (offsets[position] - self.scores[player][1], order, position, player))
+        return players
+
+    def overall_rank(self, name, position=None):
+        # 1-based rank of an undrafted player in the current Overall order (same order as best_available)
+        position, i = self._locate(name, position)
+        player = self.sorted_players[position][i]
+        key = self.scores[self.baseline_players[position]][1] - self.scores[player][1]
+        rank = self.remaining[position].count_before(i) + 1
+        for order, other in enumerate(self.positions):
+            if other == position or self.baseline_players[other] is None:
+                continue
+            # Count the remaining players of the other position that come first in the merge:
+            # a smaller key, or an equal key from a position earlier in the merge order
+            ties_first = order < self.positions.index(position)
+            offset = self.scores[self.baseline_players[other]][1]
+            sorted_players = self.sorted_players[other]
+            low, high = 0, len(sorted_players)
+            while low < high:
+                middle = (low + high) // 2
+                other_key = offset - self.scores[sorted_players[middle]][1]
+                if other_key < key or (ties_first and other_key == key):
+                    low = middle + 1
+                else:
+                    high = middle
+            rank += self.remaining[other].count_before(low)
+        return rank
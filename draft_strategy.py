@@ -0,0 +1,193 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from main import NameIndex, POSITIONS, PPR, load_platform_rankings, load_projections, score_players
+
+# Starting lineup the plans are judged on, FLEX can be any of FLEX_POSITIONS
+LINEUP = {"QB": 1, "RB": 2, "WR": 2, "TE": 1, "FLEX": 1}
+FLEX_POSITIONS = ("RB", "WR", "TE")
+
+# Opponents pick by platform rank plus normal noise with this standard deviation, as a fraction of the rank
+ADP_NOISE = 0.15
+
+
+class DraftSimulator:
+    # Runs many snake drafts side by side as numpy arrays, one row per draft
+    # Opponents take the best player by their noisy platform rank, we follow a plan of one position per round
+    # and take the best projected player of that position still there
+    # The noise is drawn once, so every plan is tried against the same drafts and differences between
+    # plans come from the plans, not from luck
+    def __init__(self, players, slot, teams=12, rounds=15, drafts=2000, scoring=PPR, lineup=LINEUP,
+                 noise=ADP_NOISE, seed=None):
+        # Any other slot never picks, and every plan would score nothing
+        if not 1 <= slot <= teams:
+            raise ValueError(f"Slot {slot} isn't a pick of a {teams} team draft, it has to be 1 to {teams}")
+        pool = [player for position in POSITIONS for player in players[position].values()]
+        if len(pool) < teams * rounds:
+            raise ValueError(f"Only {len(pool)} players for a {teams} team, {rounds} round draft")
+        scores = score_players(pool, scoring)
+        self.slot = slot - 1
+        self.teams = teams
+        self.rounds = rounds
+        self.drafts = drafts
+        self.lineup = lineup
+        self.positions = [position for position in POSITIONS if position in lineup]
+
+        # One extra "nobody" player at the end, what's taken when a position has run out
+        self.scores = np.array([scores[player][1] for player in pool] + [0.0])
+        self.position_codes = np.array([POSITIONS.index(player.position) for player in pool] + [-1])
+        self.best = {}  # position : players of the position, best projection first, then nobody
+        for position in self.positions:
+            indexes = [i for i, player in enumerate(pool) if player.position == position]
+            self.best[position] = np.array(sorted(indexes, key=lambda i: -self.scores[i]) + [len(pool)])
+
+        # Players missing from the platform rankings go after everyone ranked, best projection first
+        ranked = [player.overall_rank for player in pool if player.overall_rank != -1]
+        last_rank = max(ranked, default=0)
+        unranked = sorted((i for i, player in enumerate(pool) if player.overall_rank == -1),
+                          key=lambda i: -self.scores[i])
+        adp = np.array([player.overall_rank for player in pool], dtype=float)
+        adp[unranked] = last_rank + 1 + np.arange(len(unranked))
+        rng = np.random.default_rng(seed)
+        noisy_adp = adp + rng.standard_normal((drafts, len(pool))) * np.maximum(adp * noise, 1)
+        self.order = np.argsort(noisy_adp, axis=1)  # drafts x players, in the order opponents want them
+
+    def lineup_points(self, roster_scores, roster_codes):
+        # Per game points of the best starting lineup of every draft's roster
+        points = np.zeros(self.drafts)
+        flex = []
+        for position in self.positions:
+            position_scores = np.where(roster_codes == POSITIONS.index(position), roster_scores, 0)
+            position_scores = -np.sort(-position_scores, axis=1)
+            points += position_scores[:, :self.lineup[position]].sum(axis=1)
+            if position in FLEX_POSITIONS:
+                flex.append(position_scores[:, self.lineup[position]:])
+        if self.lineup.get("FLEX", 0) and flex:
+            flex = -np.sort(-np.concatenate(flex, axis=1), axis=1)
+            points += flex[:, :self.lineup["FLEX"]].sum(axis=1)
+        return points
+
+    @staticmethod
+    def _next_available(taken, candidates, pointers):
+        # Moves every draft's pointer into candidates forward to the first player not taken yet
+        rows = np.arange(len(pointers))
+        while True:
+            blocked = taken[rows, candidates[rows, pointers] if candidates.ndim == 2 else candidates[pointers]]
+            if not blocked.any():
+                return pointers
+            pointers += blocked
+
+    def run(self, plan):
+        # Expected per game starting lineup points when following plan, one position per round
+        # Rounds past the end of the plan take whichever position adds the most to the lineup
+        rows = np.arange(self.drafts)
+        taken = np.zeros((self.drafts, len(self.scores)), dtype=bool)
+        opponent_pointers = np.zeros(self.drafts, dtype=np.intp)
+        position_pointers = {position: np.zeros(self.drafts, dtype=np.intp) for position in self.positions}
+        roster_scores = np.zeros((self.drafts, self.rounds))
+        roster_codes = np.full((self.drafts, self.rounds), -1)
+
+        for round_ in range(self.rounds):
+            for pick in range(self.teams):
+                team = pick if round_ % 2 == 0 else self.teams - 1 - pick
+                if team != self.slot:
+                    opponent_pointers = self._next_available(taken, self.order, opponent_pointers)
+                    taken[rows, self.order[rows, opponent_pointers]] = True
+                    continue
+
+                candidates = {}
+                for position in self.positions:
+                    position_pointers[position] = self._next_available(taken, self.best[position],
+                                                                       position_pointers[position])
+                    candidates[position] = self.best[position][position_pointers[position]]
+                if round_ < len(plan):
+                    chosen = candidates[plan[round_]]
+                else:
+                    # Try every position and keep the one with the best lineup
+                    gains = []
+                    for position in self.positions:
+                        roster_scores[:, round_] = self.scores[candidates[position]]
+                        roster_codes[:, round_] = self.position_codes[candidates[position]]
+                        gains.append(self.lineup_points(roster_scores, roster_codes))
+                    best = np.argmax(np.array(gains), axis=0)
+                    chosen = np.choose(best, [candidates[position] for position in self.positions])
+                roster_scores[:, round_] = self.scores[chosen]
+                roster_codes[:, round_] = self.position_codes[chosen]
+                # Nobody can be taken any number of times
+                taken[rows, chosen] = True
+                taken[:, -1] = False
+        return float(self.lineup_points(roster_scores, roster_codes).mean())
+
+
+def useful(plan, lineup=LINEUP):
+    # Whether every pick of a plan can still end up in the starting lineup, the rest are pruned
+    flex = lineup.get("FLEX", 0)
+    for position in set(plan):
+        extra = plan.count(position) - lineup.get(position, 0)
+        if extra > (flex if position in FLEX_POSITIONS else 0):
+            return False
+        if position in FLEX_POSITIONS:
+            flex -= max(extra, 0)
+    return True
+
+
+# Set once per worker process, so the simulator (and its drafts) is only built once
+_worker_simulator = None
+
+
+def _init_worker(simulator):
+    global _worker_simulator
+    _worker_simulator = simulator
+
+
+def _run_plan(plan):
+    return _worker_simulator.run(plan)
+
+
+def optimize(simulator, plan_rounds=6, beam_width=8, workers=1):
+    # Beam search over plans for the first plan_rounds rounds
+    # Every round, each kept plan is extended by every position, the extensions are scored over
+    # all of the simulator's drafts and only the beam_width best are kept
+    # Returns [(plan, expected lineup points)], best first
+    beam = [()]
+    results = []
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(simulator,)) if workers > 1 else None
+    try:
+        for _ in range(plan_rounds):
+            plans = [plan + (position,) for plan in beam for position in simulator.positions
+                     if useful(plan + (position,), simulator.lineup)]
+            if pool is not None:
+                points = list(pool.map(_run_plan, plans))
+            else:
+                points = [simulator.run(plan) for plan in plans]
+            # Ties go to the plan found first, so results don't depend on the number of workers
+            results = sorted(zip(plans, points), key=lambda t: -t[1])
+            beam = [plan for plan, _ in results[:beam_width]]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Find the best position to take in each round of a snake draft")
+    parser.add_argument("slot", type=int, help="your pick in the first round (1 = first)")
+    parser.add_argument("--teams", type=int, default=12)
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--plan-rounds", type=int, default=6, help="rounds to plan, later rounds fill the lineup")
+    parser.add_argument("--drafts", type=int, default=2000, help="drafts simulated for every plan")
+    parser.add_argument("--beam-width", type=int, default=8, help="plans kept after every round")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    platform_name, platform_rankings = load_platform_rankings("draft_platform_rankings")
+    players = load_projections("fp_data", platform_rankings, name_index=NameIndex(platform_rankings))
+    try:
+        simulator = DraftSimulator(players, args.slot, args.teams, args.rounds, args.drafts, seed=args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    for plan, points in optimize(simulator, args.plan_rounds, args.beam_width, args.workers)[:10]:
+        print(f"{points:6.1f}  {' '.join(plan)}")
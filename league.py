@@ -0,0 +1,119 @@
+import heapq
+
+from main import POSITIONS, PPR, score_players
+from scenarios import Scenario
+
+# Slots any of several positions can fill, narrowest first since that's the order they're filled in
+FLEX_SLOTS = {
+    "FLEX": ("RB", "WR", "TE"),
+    "SUPERFLEX": ("QB", "RB", "WR", "TE")
+}
+
+# Starting lineup of a standard league
+ROSTER = {"QB": 1, "RB": 2, "WR": 2, "TE": 1, "FLEX": 1}
+
+
+def parse_roster(text):
+    # "QB=1,RB=2,WR=2,TE=1,FLEX=1" -> {"QB": 1, "RB": 2, "WR": 2, "TE": 1, "FLEX": 1}
+    roster = {}
+    for slot in text.split(","):
+        position, _, count = slot.partition("=")
+        position = position.strip().upper()
+        if position not in POSITIONS and position not in FLEX_SLOTS:
+            raise ValueError(f"Unknown roster slot {position}")
+        if not count.strip().isdigit():
+            raise ValueError(f"Roster slot {position} needs a number of players, e.g. {position}=1")
+        roster[position] = int(count)
+    return roster
+
+
+class League:
+    # Settings of one league, everything its baselines are worked out from
+    # With baseline_rounds, the baseline of a position is the number of players of that position
+    # going in the first baseline_rounds rounds by the platform rankings plus 1 (like the hard-coded BASELINE)
+    # Otherwise it is the number of players of that position that start for some team
+    def __init__(self, name, teams=12, roster=ROSTER, scoring=PPR, baseline_rounds=None):
+        self.name = name
+        self.teams = teams
+        self.roster = roster
+        self.scoring = scoring
+        self.baseline_rounds = baseline_rounds
+
+    def __repr__(self):
+        return f"League({self.name} {self.teams} teams {self.roster})"
+
+    def max_baseline(self):
+        # The most players of each position that can start, if every flex went to that position
+        # Known before any projections are read, so it can bound how many players need to be loaded
+        return {position: self.teams * (self.roster.get(position, 0) +
+                                         sum(count for slot, count in self.roster.items()
+                                             if position in FLEX_SLOTS.get(slot, ())))
+                for position in POSITIONS}
+
+    def position_limits(self, baseline):
+        # Same rule of thumb as POSITION_LIMITS: double the amount needed for rosters
+        return {position: 2 * max(baseline[position], self.teams) for position in POSITIONS}
+
+
+class BaselineAllocator:
+    # Works out league baselines from a scored player pool
+    # Every position is sorted once per scoring system, after that a league's baselines only cost a pass
+    # over its flex slots, so they can be recomputed for every league or every change of settings
+    def __init__(self, players):
+        self.players = players
+        self._sorted_scores = {}  # scoring : {position : average scores, best first}
+        # position : platform overall ranks, players missing from the platform rankings left out
+        self.ranks = {position: [player.overall_rank for player in players[position].values()
+                                 if player.overall_rank != -1]
+                      for position in POSITIONS}
+
+    def sorted_scores(self, scoring):
+        if scoring not in self._sorted_scores:
+            scores = score_players((player for position in POSITIONS for player in self.players[position].values()),
+                                   scoring)
+            self._sorted_scores[scoring] = {
+                position: sorted((scores[player][1] for player in self.players[position].values()), reverse=True)
+                for position in POSITIONS}
+        return self._sorted_scores[scoring]
+
+    def starters(self, league):
+        # Number of starters of each position in the league
+        # Dedicated slots go to the best players of their position, then every flex slot,
+        # narrowest kind first, goes to the best player left of any position it allows
+        sorted_scores = self.sorted_scores(league.scoring)
+        counts = {position: min(league.teams * league.roster.get(position, 0), len(sorted_scores[position]))
+                  for position in POSITIONS}
+        for slot, eligible in FLEX_SLOTS.items():
+            # Best remaining player of every eligible position, ties go to the position listed first
+            heap = [(-sorted_scores[position][counts[position]], order, position)
+                    for order, position in enumerate(eligible)
+                    if counts[position] < len(sorted_scores[position])]
+            heapq.heapify(heap)
+            for _ in range(league.teams * league.roster.get(slot, 0)):
+                if not heap:
+                    break
+                _, order, position = heapq.heappop(heap)
+                counts[position] += 1
+                if counts[position] < len(sorted_scores[position]):
+                    heapq.heappush(heap, (-sorted_scores[position][counts[position]], order, position))
+        return counts
+
+    def drafted(self, league):
+        # Number of players of each position going in the first baseline_rounds rounds by the platform rankings
+        picks = league.teams * league.baseline_rounds
+        return {position: sum(1 for rank in self.ranks[position] if rank <= picks) for position in POSITIONS}
+
+    def baseline(self, league):
+        # Index of the baseline player of every position, i.e. the first player past the starters
+        # With baseline_rounds it is the number drafted plus 1, the same convention as the hard-coded BASELINE
+        if league.baseline_rounds is None:
+            counts = self.starters(league)
+        else:
+            counts = {position: count + 1 for position, count in self.drafted(league).items()}
+        return {position: max(min(count, len(self.players[position]) - 1), 0)
+                for position, count in counts.items()}
+
+    def scenario(self, league):
+        # The league as a Scenario, ready for run_scenarios
+        baseline = self.baseline(league)
+        return Scenario(league.name, league.scoring, baseline, league.position_limits(baseline))
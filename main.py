@@ -1,20 +1,26 @@
+import argparse
 import csv
+import heapq
+import math
 import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import xlsxwriter
 
+import profiling
+import projection_sources
+from name_matching import NameIndex
+from rebuild_cache import BuildCache, hash_dir, hash_file, hash_key
+
 
 ## TODO: this should probably go somewhere else
 GOOD_COLOR = "#00FF00"
 NEUTRAL_COLOR = "#FFFFFF"
 BAD_COLOR = "#FF6347"
 
-# TODO: need something better for when names differ slightly
-#  between projections and draft platform rankings
-def fix_name(name):
-    return name.replace("Jr.", "").replace("Sr.", "").replace("III", "").replace("II", "").strip()
-
-
 class PPR:
     weights = {
         "PASS_YDS": 0.04,
@@ -32,58 +38,300 @@ class PPR:
         "RUSH_ATT": 0
     }
 
-    @staticmethod
-    def score(stat_dict):
+    @classmethod
+    def score(cls, stat_dict):
         if stat_dict == {}:
             return None
         score = 0
         for stat in stat_dict:
-            score += stat_dict[stat] * PPR.weights[stat]
+            score += stat_dict[stat] * cls.weights[stat]
         # Divide by 17 to get per game score as it is easier to visualize
         return score / 17
 
+    @classmethod
+    def score_row(cls, row, stat_columns, stat_order=()):
+        # Same as score, for a projection row laid out by stat_columns
+        # Stats are added up in stat_order, the order of the columns of the file they came from, so the sum
+        # is exactly the same as adding up the file's row from left to right
+        if row is None:
+            return None
+        score = 0
+        for stat, column in stat_columns.scoring_columns(stat_order):
+            if column < len(row) and not math.isnan(row[column]):
+                score += row[column] * cls.weights[stat]
+        return score / 17
+
+    @classmethod
+    def weight_vector(cls, stats):
+        # Weights lined up with the stat columns of a ProjectionMatrix
+        return np.array([cls.weights[stat] for stat in stats], dtype=float)
+
+
+class HalfPPR(PPR):
+    weights = {**PPR.weights, "REC": 0.5}
+
+
+class Standard(PPR):
+    weights = {**PPR.weights, "REC": 0}
+
+
+class SixPointPassTD(PPR):
+    weights = {**PPR.weights, "PASS_TDS": 6}
+
+
+class StatColumns:
+    # Column index shared by all players' projection rows, so each player stores
+    # a flat array of floats instead of a dict repeating every stat name
+    def __init__(self):
+        self.names = []
+        self.index = {}  # stat : column
+        self._scoring_columns = {}  # stat order : [(stat, column)], see scoring_columns
+
+    def __len__(self):
+        return len(self.names)
+
+    def column(self, stat):
+        if stat not in self.index:
+            self.index[stat] = len(self.names)
+            self.names.append(stat)
+            self._scoring_columns.clear()
+        return self.index[stat]
+
+    def scoring_columns(self, stat_order):
+        # (stat, column) in the order stats are added up when scoring: stat_order first, then any other
+        # stats in alphabetical order (see scoring_order)
+        columns = self._scoring_columns.get(stat_order)
+        if columns is None:
+            columns = [(stat, self.index[stat]) for stat in scoring_order(stat_order, self.names)
+                       if stat in self.index]
+            self._scoring_columns[stat_order] = columns
+        return columns
+
+    def to_row(self, stats):
+        # Stats without a projection are NaN, and no stats at all is None
+        if not stats:
+            return None
+        columns = [self.column(stat) for stat in stats]
+        row = array('d', [math.nan]) * len(self)
+        for column, value in zip(columns, stats.values()):
+            row[column] = value
+        return row
+
+    def to_dict(self, row, stat_order=()):
+        # In scoring order, so PPR.score gives the same score as PPR.score_row
+        if row is None:
+            return {}
+        # Rows made before a column was added are shorter than the index
+        return {stat: row[column] for stat, column in self.scoring_columns(stat_order)
+                if column < len(row) and not math.isnan(row[column])}
+
+
+def scoring_order(stat_order, stats):
+    # Order stats are added up in: the file's column order, then stats the file doesn't have alphabetically
+    # Floating point sums depend on their order, and this is the order the original per-row sums used
+    return list(stat_order) + sorted(stat for stat in stats if stat not in stat_order)
+
+
+# Shared by every player unless told otherwise
+STAT_COLUMNS = StatColumns()
+
 
 class Player:
-    def __init__(self, name, position, team, platform_ranking):
+    __slots__ = ("name", "position", "team", "overall_rank", "position_rank", "stat_columns", "stat_order",
+                 "_low", "_average", "_high", "_scores")
+
+    # How often get_score was answered from the score cache vs. computed
+    score_cache_hits = 0
+    score_cache_misses = 0
+
+    def __init__(self, name, position, team, platform_ranking, stat_columns=STAT_COLUMNS, stat_order=()):
         self.name = name
         self.position = position
         self.team = team
         self.overall_rank = platform_ranking[0]
         self.position_rank = platform_ranking[1]
-        self.average_projection = {}
-        self.high_projection = {}
-        self.low_projection = {}
+        self.stat_columns = stat_columns
+        # Stats in the column order of the projection file, the order they're added up in when scoring
+        # One tuple shared by every player of the file
+        self.stat_order = stat_order
+        # One array('d') per projection type, laid out by stat_columns
+        self._low = None
+        self._average = None
+        self._high = None
+        self._scores = {}  # scoring system : (low, avg, high)
+
+    @property
+    def average_projection(self):
+        return self.stat_columns.to_dict(self._average, self.stat_order)
+
+    @property
+    def high_projection(self):
+        return self.stat_columns.to_dict(self._high, self.stat_order)
+
+    @property
+    def low_projection(self):
+        return self.stat_columns.to_dict(self._low, self.stat_order)
+
+    def projection_rows(self):
+        # Same order as get_score
+        return self._low, self._average, self._high
 
     def get_score(self, scoring=PPR):
-        return (scoring.score(self.low_projection),
-                scoring.score(self.average_projection),
-                scoring.score(self.high_projection))
+        if scoring in self._scores:
+            Player.score_cache_hits += 1
+            return self._scores[scoring]
+        Player.score_cache_misses += 1
+        score = (scoring.score_row(self._low, self.stat_columns, self.stat_order),
+                 scoring.score_row(self._average, self.stat_columns, self.stat_order),
+                 scoring.score_row(self._high, self.stat_columns, self.stat_order))
+        self._scores[scoring] = score
+        return score
+
+    def has_cached_score(self, scoring=PPR):
+        return scoring in self._scores
+
+    def cache_score(self, scoring, score):
+        # Used by batch scoring to fill the cache without going through get_score
+        Player.score_cache_misses += 1
+        self._scores[scoring] = score
 
     def set_projections(self, projection_type, data):
+        # Stats new to the player are added up after the ones it has, in the order given
+        new_stats = tuple(stat for stat in data if stat not in self.stat_order)
+        if new_stats:
+            self.stat_order += new_stats
+        self.set_projection_row(projection_type, self.stat_columns.to_row(data))
+
+    def set_projection_row(self, projection_type, row):
         if projection_type == 'average':
-            self.average_projection = data
+            self._average = row
         elif projection_type == 'high':
-            self.high_projection = data
+            self._high = row
         elif projection_type == 'low':
-            self.low_projection = data
+            self._low = row
+        # Cached scores were computed from the old projections
+        self._scores.clear()
+
+    @staticmethod
+    def score_cache_info():
+        return {"hits": Player.score_cache_hits, "misses": Player.score_cache_misses}
+
+    @staticmethod
+    def reset_score_cache_info():
+        Player.score_cache_hits = 0
+        Player.score_cache_misses = 0
 
     def __repr__(self):
         return f"Player({self.position} {self.name})"
 
 
-def get_baseline_projections(player, baseline_player):
-    # Returns projections relative to the baseline player, plus the range
-    baseline_avg = baseline_player.get_score()[1]
-    low, avg, high = player.get_score()
+class ProjectionMatrix:
+    # Stacks the projections of a pool of players into one players x tiers x stats array,
+    # so every tier of every player can be scored with a single matrix product
+    tiers = ("low", "average", "high")  # same order as Player.get_score
+
+    def __init__(self, players):
+        self.players = list(players)
+        # Players normally share one StatColumns, but ones loaded separately (e.g. unpickled) may not
+        all_stat_columns = list({id(player.stat_columns): player.stat_columns for player in self.players}.values())
+        stats = sorted({stat for stat_columns in all_stat_columns for stat in stat_columns.names})
+        column = {stat: i for i, stat in enumerate(stats)}
+        # Where each shared column goes in this matrix
+        layouts = {id(stat_columns): np.array([column[stat] for stat in stat_columns.names], dtype=np.intp)
+                   for stat_columns in all_stat_columns}
+
+        # Rows sharing a layout and length are copied in together with one numpy call
+        groups = {}  # (layout, row length) : (player indexes, tier indexes, rows)
+        for i, player in enumerate(self.players):
+            for j, row in enumerate(player.projection_rows()):
+                if row is not None:
+                    group = groups.setdefault((id(player.stat_columns), len(row)), ([], [], []))
+                    group[0].append(i)
+                    group[1].append(j)
+                    group[2].append(row)
+
+        values = np.full((len(self.players), len(self.tiers), len(stats)), np.nan)
+        for (layout, length), (player_indexes, tier_indexes, rows) in groups.items():
+            block = np.frombuffer(b"".join(rows)).reshape(len(rows), length)
+            player_indexes = np.array(player_indexes)[:, None]
+            tier_indexes = np.array(tier_indexes)[:, None]
+            values[player_indexes, tier_indexes, layouts[layout][:length]] = block
+
+        missing = np.isnan(values)
+        # A tier with no projections scores as None rather than 0
+        self.has_tier = ~missing.all(axis=2)
+        # Only keep stats somebody in the pool has a projection for
+        present = ~missing.all(axis=(0, 1))
+        self.stats = [stat for stat, is_present in zip(stats, present) if is_present]
+        self.values = np.nan_to_num(values[:, :, present])
+
+        # Players scored together because their stats are added up in the same order (see scoring_order),
+        # normally one group per projection file
+        orders = {}  # id(stat order) : stat order
+        groups = {}  # stat order : player indexes
+        for i, player in enumerate(self.players):
+            stat_order = orders.setdefault(id(player.stat_order), player.stat_order)
+            groups.setdefault(stat_order, []).append(i)
+        column = {stat: i for i, stat in enumerate(self.stats)}
+        # [(player indexes, matrix columns in the order they're added up)]
+        self.order_groups = [(np.array(indexes, dtype=np.intp),
+                              [column[stat] for stat in scoring_order(stat_order, self.stats) if stat in column])
+                             for stat_order, indexes in groups.items()]
+
+    def score(self, scorings=(PPR,)):
+        # Returns a players x tiers x scorings array of per game scores (NaN for missing tiers)
+        weights = np.column_stack([scoring.weight_vector(self.stats) for scoring in scorings])  # stats x scorings
+        # Accumulate one stat column at a time rather than using @, in each player's scoring order, so the
+        # scores are exactly the ones PPR.score_row gives whichever players and scoring systems share the batch
+        scores = np.zeros((len(self.players), len(self.tiers), len(scorings)))
+        for indexes, columns in self.order_groups:
+            # Most pools are a single group, which needs no copying
+            values = self.values if len(indexes) == len(self.players) else self.values[indexes]
+            group_scores = np.zeros((len(indexes), len(self.tiers), len(scorings)))
+            for column in columns:
+                group_scores += values[:, :, column, None] * weights[column]
+            scores[indexes] = group_scores
+        # Divide by 17 to get per game score, same as PPR.score
+        scores /= 17
+        scores[~self.has_tier] = np.nan
+        return scores
+
+
+def score_players(players, scoring=PPR):
+    # Scores the whole pool in one batched call, returns {player: (low, avg, high)}
+    # Players that already have a cached score for this scoring system are not rescored
+    scores = {}
+    uncached = []
+    for player in players:
+        if player.has_cached_score(scoring):
+            scores[player] = player.get_score(scoring)
+        else:
+            uncached.append(player)
+
+    matrix = ProjectionMatrix(uncached)
+    for player, row in zip(matrix.players, matrix.score([scoring])[:, :, 0].tolist()):
+        score = tuple(None if np.isnan(value) else value for value in row)
+        player.cache_score(scoring, score)
+        scores[player] = score
+    return scores
+
+
+def get_baseline_projections(score, baseline_score):
+    # Returns projections relative to the baseline player's score, plus the range
+    baseline_avg = baseline_score[1]
+    low, avg, high = score
     low_relative = low - baseline_avg
     avg_relative = avg - baseline_avg
     high_relative = high - baseline_avg
     return low_relative, avg_relative, high_relative, high - low
 
 
-def parse_csv(file_path, position, platform_rankings):
-    players = {}
-    current_player = None
+def iter_projection_records(file_path, stat_columns=STAT_COLUMNS):
+    # Stream a projection file one player at a time, so callers don't have to hold the whole file
+    # Yields (player_name, team, projections, stat_order) where projections is {projection_type: row},
+    # each row an array('d') laid out by stat_columns (see StatColumns.to_row), and stat_order the file's stats
+    # in column order, one tuple shared by every record of the file
+    record = None
     current_type = None
 
     with open(file_path, mode='r') as file:
@@ -95,45 +343,96 @@ def parse_csv(file_path, position, platform_rankings):
 
         # Determine the columns to include (ignore "FPTS")
         relevant_columns = [i for i, header in enumerate(headers) if header not in ("FPTS")]
+        # Skip the first two relevant columns (Team, Player), and find where the rest go in a row
+        stat_positions = [(i, stat_columns.column(headers[i])) for i in relevant_columns[2:]]
+        stat_order = tuple(headers[i] for i in relevant_columns[2:])
+        empty_row = array('d', [math.nan]) * len(stat_columns)
 
+        rows_read = 0
         for row in reader:
-            # Some rows at the bottom are empty
-            if len(row) == 1:
+            # Some rows at the bottom are empty, or only commas when saved from a spreadsheet
+            if not any(cell.strip() for cell in row):
                 continue
+            rows_read += 1
             if row[0].strip():  # New player entry
-                player_name = row[0].strip()
-                team = row[1].replace("high", "")
-                if player_name not in platform_rankings:
-                    if (fixed_name := fix_name(player_name)) in platform_rankings:
-                        platform_rankings[player_name] = platform_rankings[fixed_name]
-                        del platform_rankings[fixed_name]
-                    else:
-                        if len(platform_rankings) > 0:
-                            print(f"Error: {player_name} not found in platform rankings")
-                        platform_rankings[player_name] = (-1, -1)
-                current_player = Player(player_name, position, team, platform_rankings[player_name])
+                if record is not None:
+                    yield record
+                record = (row[0].strip(), row[1].replace("high", ""), {}, stat_order)
                 current_type = 'average'
-                players[player_name] = current_player
 
             elif 'high' in row[1]:
                 current_type = 'high'
             elif 'low' in row[1]:
                 current_type = 'low'
 
-            # Parse stats into a dictionary, skipping "Team" and "FPTS"
-            stats = {}
-            for i in relevant_columns[2:]:  # Skip the first two relevant columns (Team, Player)
+            # Parse stats into a row, skipping "Team" and "FPTS"
+            stats = None
+            for i, column in stat_positions:
                 if row[i].strip():
-                    stats[headers[i]] = float(row[i].replace(',',''))
-
-            current_player.set_projections(current_type, stats)
-
+                    if stats is None:
+                        stats = array('d', empty_row)
+                    stats[column] = float(row[i].replace(',',''))
+
+            record[2][current_type] = stats
+
+    profiling.count("projection rows", rows_read)
+    if record is not None:
+        yield record
+
+
+def projection_records(file_path, stat_columns=STAT_COLUMNS, reader="csv", keep=None, scoring=PPR):
+    # Records of a projection file, see iter_projection_records, read with one of the readers:
+    # "csv" streams the file with the csv module, "pandas" parses it all at once and "npy" only parses
+    # a file the first time it sees it, reading a stored binary copy after that
+    # If keep is given, only the top `keep` players by average score are returned
+    if reader == "csv":
+        records = iter_projection_records(file_path, stat_columns)
+        return records if keep is None else top_records(records, keep, scoring, stat_columns)
+    table = projection_sources.TABLE_READERS[reader](file_path)
+    # The whole file is in arrays already, so the top players are picked before any records are made
+    return table.records(stat_columns, None if keep is None else table.top_players(keep, scoring.weights))
+
+
+def top_records(records, keep, scoring=PPR, stat_columns=STAT_COLUMNS):
+    # Only hold on to the `keep` records with the best average score, using a running min-heap,
+    # and return them in their original order
+    heap = []
+    for i, record in enumerate(records):
+        avg = scoring.score_row(record[2].get('average'), stat_columns, record[3])
+        # Ties go to the earlier record, same as a stable sort
+        key = (float("-inf") if avg is None else avg, -i)
+        if len(heap) < keep:
+            heapq.heappush(heap, (key, record))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, record))
+    return [record for key, record in sorted(heap, key=lambda item: -item[0][1])]
+
+
+def parse_csv(file_path, position, platform_rankings, keep=None, scoring=PPR, stat_columns=STAT_COLUMNS,
+              name_index=None, reader="csv"):
+    # If keep is given, only the top `keep` players by average score are loaded
+    # Pass a NameIndex over platform_rankings to share it between files
+    if name_index is None:
+        name_index = NameIndex(platform_rankings)
+    players = {}
+    records = projection_records(file_path, stat_columns, reader, keep, scoring)
+
+    for player_name, team, projections, stat_order in records:
+        match = name_index.match(player_name, position)
+        if match.method == "missing" and len(platform_rankings) > 0:
+            print(f"Error: {player_name} not found in platform rankings")
+        current_player = Player(player_name, position, team, name_index.ranking(match), stat_columns, stat_order)
+        for projection_type, row in projections.items():
+            current_player.set_projection_row(projection_type, row)
+        players[player_name] = current_player
+
+    profiling.count("players", len(players))
     return players
 
 
 def parse_platform_rankings(file_path):
     # Process and store rankings from the draft platform (for comparison)
-    platform_rankings = {}  # player : (overall_rank, position_rank)
+    platform_rankings = {}  # player : (overall_rank, position_rank, position)
     with open(file_path, mode='r', encoding='utf-8-sig') as file:
         reader = csv.reader(file)
         headers = next(reader)
@@ -150,7 +449,7 @@ def parse_platform_rankings(file_path):
         for i, row in enumerate(reader):
             if (position := row[position_col]) not in pos_rank:
                 pos_rank[position] = 1
-            platform_rankings[row[name_col]] = (i + 1, pos_rank[position])
+            platform_rankings[row[name_col]] = (i + 1, pos_rank[position], position)
             pos_rank[position] += 1
     return platform_name, platform_rankings
 
@@ -172,115 +471,326 @@ def parse_team_rankings(file_path):
         return team_rankings
 
 
-if __name__ == '__main__':
+# Positions with their own projection file and sheet, "Overall" combines them
+POSITIONS = ["QB", "TE", "RB", "WR"]
+
+# Baseline is the number of that position drafted through 9 round last year plus 1
+BASELINE = {
+    "QB": 11,
+    "TE": 12,
+    "RB": 39,
+    "WR": 49
+}
+# Only keep a certain amount of player projections per position
+# Rule of thumb here will be double the amount needed for rosters
+POSITION_LIMITS = {
+    "QB": 12 * 2,
+    "TE": 12 * 2,
+    "RB": 36 * 2,
+    "WR": 48 * 2
+}
+
+
+def load_platform_rankings(ranking_data_dir):
     # Process and store rankings from the draft platform (for comparison)
-    ranking_data_dir = "draft_platform_rankings"
     platform_name = None
     platform_rankings = {}
     for f in os.listdir(ranking_data_dir):
         if not f.endswith(".csv"):
             continue
         platform_name, platform_rankings = parse_platform_rankings(os.path.join(ranking_data_dir, f))
+    return platform_name, platform_rankings
+
+
+def pool_limits(baseline=BASELINE, position_limits=POSITION_LIMITS):
+    # How many players of each position can ever make it onto a sheet or be the baseline player
+    # Everyone ahead of a player at their own position is also ahead of them on the Overall sheet,
+    # so a player ranked past the Overall limit at their position can't show up there either
+    overall_limit = sum(position_limits.values())
+    return {position: max(position_limits[position], baseline[position] + 1, overall_limit)
+            for position in position_limits}
+
 
+def load_projections(data_dir, platform_rankings, keep=None, name_index=None, reader="csv"):
     # Gather projections from Fantasy Pros
-    data_dir = "fp_data"
+    # keep optionally limits how many players are loaded per position (see pool_limits)
+    if name_index is None:
+        name_index = NameIndex(platform_rankings)
     players = {"QB": {}, "TE": {}, "RB": {}, "WR": {}, "Overall": {}}
     for f in os.listdir(data_dir):
         if not f.endswith(".csv"):
             continue
         position = f.split(".")[0].split("_")[-1]
-        player_dict = parse_csv(os.path.join(data_dir, f), position, platform_rankings)
+        player_dict = parse_csv(os.path.join(data_dir, f), position, platform_rankings,
+                                None if keep is None else keep.get(position), name_index=name_index, reader=reader)
         players[position] = player_dict
         players["Overall"].update(player_dict)
+    return players
 
-    # Baseline is the number of that position drafted through 9 round last year plus 1
-    baseline = {
-        "QB": 11,
-        "TE": 12,
-        "RB": 39,
-        "WR": 49
-    }
-    baseline["Overall"] = sum(baseline.values())
-    # Only keep a certain amount of player projections per position
-    # Rule of thumb here will be double the amount needed for rosters
-    position_limits = {
-        "QB": 12 * 2,
-        "TE": 12 * 2,
-        "RB": 36 * 2,
-        "WR": 48 * 2
-    }
-    position_limits["Overall"] = sum(position_limits.values())
+
+def rank_position(players, scores, platform_name, baseline_index, limit):
+    # Rank a single position against its baseline player
+    # Returns (headers, rows, data, baseline_player), where data is
+    # player_name : (low_relative, avg_relative, high_relative, range) for every player shown
+    headers = ["Name", "Team", "Low", "Avg", "High", "Range", str(platform_name)]
+    rows = []
+    data = {}
+
+    # Sort players by their projected score
+    sorted_players = sorted(players.values(), key=lambda P: scores[P][1], reverse=True)
+    # Save baseline player for this position
+    baseline_player = sorted_players[baseline_index]
+
+    # Generate one row per player, up to the positional limit for players shown
+    for rank, player in enumerate(sorted_players[:limit]):
+        low_relative, avg_relative, high_relative, range_ = get_baseline_projections(scores[player],
+                                                                                     scores[baseline_player])
+        # Calculate difference between projected rank and rank on drafting platform
+        # If rank data is missing, make rank_diff very small, so it's obvious on the sheet
+        rank_diff = -9999 if player.position_rank == -1 else player.position_rank - (rank + 1)
+        rows.append((player.name, player.team, low_relative, avg_relative, high_relative, range_, rank_diff))
+        # Save this data to use when processing a combined position sheet
+        data[player.name] = (low_relative, avg_relative, high_relative, range_)
+
+    return headers, rows, data, baseline_player
+
+
+def rank_overall(players, scores, platform_name, data, baseline_players, limit):
+    # Rank a combination of positions by value over their own position's baseline player
+    # data is what rank_position returned for each position, merged
+    headers = ["Name", "Pos.", "Team", "Low", "Avg", "High", "Range", str(platform_name)]
+    rows = []
+    data = dict(data)
+
+    # Collect all positional scores for the players
+    players_with_scores = []
+    for player in players.values():
+        if player.name in data:
+            players_with_scores.append((player, data[player.name]))
+        else:
+            info = get_baseline_projections(scores[player], scores[baseline_players[player.position]])
+            data[player.name] = info
+            players_with_scores.append((player, info))
+
+    # Sort players by their avg relative projected score
+    # This will create a ranking for positional scarcity
+    sorted_players = sorted(players_with_scores, key=lambda t: t[1][1], reverse=True)
+
+    # Generate one row per player, up to the positional limit for players shown
+    for rank, player_tuple in enumerate(sorted_players[:limit]):
+        # Unpack info from tuples
+        player, player_info = player_tuple
+        low_relative, avg_relative, high_relative, range_ = player_info
+        # Calculate difference between projected rank and rank on drafting platform
+        # If rank data is missing, make rank_diff very small, so it's obvious on the sheet
+        rank_diff = -9999 if player.overall_rank == -1 else player.overall_rank - (rank + 1)
+        # Add row
+        rows.append((player.name, player.position, player.team,
+                     low_relative, avg_relative, high_relative, range_, rank_diff))
+
+    return headers, rows
+
+
+def rank_players(players, platform_name, scoring=PPR, baseline=BASELINE, position_limits=POSITION_LIMITS):
+    # Ranks every position, and all positions combined, relative to the baseline players
+    # Returns {position: (headers, rows)}, where a row is
+    # (name, [position,] team, low, avg, high, range, platform rank diff)
+    baseline = {**baseline, "Overall": sum(baseline.values())}
+    position_limits = {**position_limits, "Overall": sum(position_limits.values())}
+
+    # Score every player once, all projection tiers in a single batched call
+    scores = score_players((player for position in POSITIONS for player in players[position].values()), scoring)
 
     # Find projection of baseline player at every position
     # This is what we will compare against
-    data = {}  # player_name : (pos, pos_low_proj, pos_avg_proj, pos_high_proj)
+    rankings = {}
+    data = {}  # player_name : (low_relative, avg_relative, high_relative, range)
     baseline_players = {}
     # Loop through positions in reverse order so that combined position categories process last
     for position in sorted(baseline.keys(), reverse=True):
-        if position in ["QB", "TE", "RB", "WR"]:
-            # Process a single position
-            # Set headers
-            rows = [f"Name,Team,Low,Avg,High,Range,{platform_name}\n"]
-
-            # Sort players by their projected score
-            sorted_players = sorted(players[position].values(), key=lambda P: P.get_score()[1], reverse=True)
-            # Save baseline player for this position
-            baseline_player = sorted_players[baseline[position]]
-            baseline_players[position] = baseline_player
-
-            # Generate one row per player, up to the positional limit for players shown
-            for rank, player in enumerate(sorted_players[:position_limits[position]]):
-                low_relative, avg_relative, high_relative, range_ = get_baseline_projections(player, baseline_player)
-                # Calculate difference between projected rank and rank on drafting platform
-                # If rank data is missing, make rank_diff very small, so it's obvious on the sheet
-                rank_diff = -9999 if player.position_rank == -1 else player.position_rank - (rank + 1)
-                rows.append(','.join([player.name, player.team, f"{low_relative:.1f}", f"{avg_relative:.1f}",
-                                      f"{high_relative:.1f}", f"{range_:.1f}", f"{rank_diff}\n"]))
-                # Save this data to use when processing a combined position sheet
-                data[player.name] = (low_relative, avg_relative, high_relative, range_)
-
+        if position in POSITIONS:
+            headers, rows, position_data, baseline_players[position] = rank_position(
+                players[position], scores, platform_name, baseline[position], position_limits[position])
+            data.update(position_data)
         else:
-            # Process a combination of positions
-            # Set headers
-            rows = [f"Name,Pos.,Team,Low,Avg,High,Range,{platform_name}\n"]
-
-            # Collect all positional scores for the players
-            players_with_scores = []
-            for player in players[position].values():
-                if player.name in data:
-                    players_with_scores.append((player, data[player.name]))
-                else:
-                    info = get_baseline_projections(player, baseline_players[player.position])
-                    data[player.name] = info
-                    players_with_scores.append((player, info))
-
-            # Sort players by their avg relative projected score
-            # This will create a ranking for positional scarcity
-            sorted_players = sorted(players_with_scores, key=lambda t: t[1][1], reverse=True)
-
-            # Generate one row per player, up to the positional limit for players shown
-            for rank, player_tuple in enumerate(sorted_players[:position_limits[position]]):
-                # Unpack info from tuples
-                player, player_info = player_tuple
-                low_relative, avg_relative, high_relative, range_ = player_info
-                # Calculate difference between projected rank and rank on drafting platform
-                # If rank data is missing, make rank_diff very small, so it's obvious on the sheet
-                rank_diff = -9999 if player.overall_rank == -1 else player.overall_rank - (rank + 1)
-                # Add row
-                rows.append(','.join([player.name, player.position, player.team,
-                                      f"{low_relative:.1f}", f"{avg_relative:.1f}",
-                                      f"{high_relative:.1f}", f"{range_:.1f}", f"{rank_diff}\n"]))
-
-        # Write results to CSV
-        with open(os.path.join("output", f"{position}.csv"), "w") as f:
-            f.writelines(rows)
+            headers, rows = rank_overall(players[position], scores, platform_name, data, baseline_players,
+                                         position_limits[position])
+        rankings[position] = (headers, rows)
+    return rankings
+
+
+def _rank_file(task):
+    # Parse, score, rank and write out one position file
+    # Runs on a worker process in parallel mode, so everything it needs comes in the task
+    file_path, position, name_index, platform_name, scoring, baseline_index, limit, keep, output_dir, reader = task
+    matches_start = len(name_index.matches)
+    with profiling.stage("projection parse"):
+        players = parse_csv(file_path, position, name_index.platform_rankings, keep, scoring, name_index=name_index,
+                            reader=reader)
+    with profiling.stage("scoring"):
+        scores = score_players(players.values(), scoring)
+    with profiling.stage("ranking"):
+        headers, rows, data, baseline_player = rank_position(players, scores, platform_name, baseline_index, limit)
+    if output_dir is not None:
+        with profiling.stage("csv write"):
+            write_csv(os.path.join(output_dir, f"{position}.csv"), headers, rows)
+    return position, players, (headers, rows), data, baseline_player, name_index.matches[matches_start:]
+
+
+# main.py and every module of this repository it imports, directly or not
+CODE_FILES = ["main.py", "league.py", "name_matching.py", "profiling.py", "projection_sources.py",
+              "rebuild_cache.py", "scenarios.py", "simulation.py"]
+
+
+def code_hash():
+    # Cached results are only good for the code that made them, so every module main.py uses is hashed
+    # Some of them import main and are only imported once needed, so they're all hashed by their path
+    code_dir = os.path.dirname(os.path.abspath(__file__))
+    return hash_key(*(hash_file(os.path.join(code_dir, f)) for f in CODE_FILES))
+
+
+def rank_files(data_dir, platform_name, name_index, output_dir=None, scoring=PPR, baseline=BASELINE,
+               position_limits=POSITION_LIMITS, workers=1, cache=None, reader="csv"):
+    # The whole parse/score/rank pipeline, also writing every sheet to a CSV in output_dir if given
+    # Positions are independent until the Overall sheet, so with workers > 1 each position file
+    # is handled on its own process, and Overall is merged from their results at the end
+    # With a BuildCache, a position is only redone if its file, the platform rankings or the settings changed
+    # Returns (players, rankings), same layout as load_projections and rank_players
+    keep = pool_limits(baseline, position_limits)
+    if cache is not None:
+        settings_key = hash_key(code_hash(), sorted(name_index.platform_rankings.items()), platform_name,
+                                scoring.__name__, scoring.weights)
+    tasks = []
+    results = {}  # task index : result
+    keys = {}  # task index : cache key
+    for f in os.listdir(data_dir):
+        if not f.endswith(".csv"):
+            continue
+        position = f.split(".")[0].split("_")[-1]
+        task = (os.path.join(data_dir, f), position, name_index, platform_name, scoring,
+                baseline[position], position_limits[position], keep[position], output_dir, reader)
+        if cache is not None:
+            keys[len(tasks)] = hash_key(settings_key, hash_file(task[0]), task[5:8])
+            result = cache.load(f"rank_file:{f}", keys[len(tasks)])
+            if result is not None:
+                results[len(tasks)] = result
+                # Recreate what the task would have done itself
+                name_index.matches.extend(result[-1])
+                if output_dir is not None:
+                    write_csv(os.path.join(output_dir, f"{position}.csv"), *result[2])
+        tasks.append(task)
+
+    todo = [i for i in range(len(tasks)) if i not in results]
+    if workers > 1 and len(todo) > 1:
+        # The stages of each position run on the workers, only the total shows up when profiling
+        with profiling.stage("position files (workers)"), ProcessPoolExecutor(workers) as pool:
+            results.update(zip(todo, pool.map(_rank_file, [tasks[i] for i in todo])))
+        # Workers matched names against their own copy of the index
+        for i in todo:
+            name_index.matches.extend(results[i][-1])
+    else:
+        results.update((i, _rank_file(tasks[i])) for i in todo)
 
-    # parse team rankings
-    team_rankings = parse_team_rankings(os.path.join("notes", "teams.csv"))
+    if cache is not None:
+        for i in todo:
+            cache.store(f"rank_file:{os.path.basename(tasks[i][0])}", keys[i], results[i])
+    results = [results[i] for i in range(len(tasks))]
 
+    # Merge in file order and then position order, exactly as load_projections and rank_players do,
+    # so the result doesn't depend on the number of workers
+    players = {"QB": {}, "TE": {}, "RB": {}, "WR": {}, "Overall": {}}
+    rankings = {}
+    position_data = {}
+    baseline_players = {}
+    for position, position_players, ranking, data, baseline_player, matches in results:
+        players[position] = position_players
+        players["Overall"].update(position_players)
+        rankings[position] = ranking
+        position_data[position] = data
+        baseline_players[position] = baseline_player
+    data = {}
+    for position in sorted(position_data, reverse=True):
+        data.update(position_data[position])
+
+    # Scores are already cached on the players, this only collects them
+    with profiling.stage("scoring"):
+        scores = score_players(players["Overall"].values(), scoring)
+    with profiling.stage("ranking"):
+        rankings["Overall"] = rank_overall(players["Overall"], scores, platform_name, data, baseline_players,
+                                           sum(position_limits.values()))
+    if output_dir is not None:
+        with profiling.stage("csv write"):
+            write_csv(os.path.join(output_dir, "Overall.csv"), *rankings["Overall"])
+    return players, rankings
+
+
+def write_csv(file_path, headers, rows):
+    # Projections are written with one decimal, everything else as is
+    with open(file_path, "w") as f:
+        f.write(','.join(headers) + "\n")
+        for row in rows:
+            f.write(','.join(f"{value:.1f}" if isinstance(value, float) else str(value) for value in row) + "\n")
+    profiling.count("csv rows", len(rows))
+
+
+def ranking_table(headers, rows):
+    # In memory version of a ranking CSV, projections rounded to one decimal like they are written out
+    return pd.DataFrame([[round(value, 1) if isinstance(value, float) else value for value in row] for row in rows],
+                        columns=headers)
+
+
+def team_colors(team_rankings):
+    # Color for every team, going from GOOD_COLOR for the best team through NEUTRAL_COLOR to BAD_COLOR
+    good_rgb = (int(GOOD_COLOR[1:3], 16), int(GOOD_COLOR[3:5], 16), int(GOOD_COLOR[5:7], 16))
+    neutral_rgb = (int(NEUTRAL_COLOR[1:3], 16), int(NEUTRAL_COLOR[3:5], 16), int(NEUTRAL_COLOR[5:7], 16))
+    bad_rgb = (int(BAD_COLOR[1:3], 16), int(BAD_COLOR[3:5], 16), int(BAD_COLOR[5:7], 16))
+    half_of_rankings = len(team_rankings) / 2
+    step_btwn_good_and_neutral = ((neutral_rgb[0] - good_rgb[0]) / half_of_rankings,
+                                  (neutral_rgb[1] - good_rgb[1]) / half_of_rankings,
+                                  (neutral_rgb[2] - good_rgb[2]) / half_of_rankings,)
+    step_btwn_neutral_and_bad = ((neutral_rgb[0] - bad_rgb[0]) / half_of_rankings,
+                                  (neutral_rgb[1] - bad_rgb[1]) / half_of_rankings,
+                                  (neutral_rgb[2] - bad_rgb[2]) / half_of_rankings,)
+    color_range = []
+    for i in range(len(team_rankings)):
+        if i < half_of_rankings:
+            rgb = (round(good_rgb[0] + (i * step_btwn_good_and_neutral[0])),
+                   round(good_rgb[1] + (i * step_btwn_good_and_neutral[1])),
+                   round(good_rgb[2] + (i * step_btwn_good_and_neutral[2])))
+            color_range.append(f"#{rgb[0]:02X}{rgb[1]:02X}{rgb[2]:02X}")
+        elif i == half_of_rankings:
+            color_range.append(NEUTRAL_COLOR)
+        else:
+            i -= round(half_of_rankings)
+            rgb = (round(neutral_rgb[0] - (i * step_btwn_neutral_and_bad[0])),
+                   round(neutral_rgb[1] - (i * step_btwn_neutral_and_bad[1])),
+                   round(neutral_rgb[2] - (i * step_btwn_neutral_and_bad[2])))
+            color_range.append(f"#{rgb[0]:02X}{rgb[1]:02X}{rgb[2]:02X}")
+    return {team: color_range[rank - 1] for team, rank in team_rankings.items()}
+
+
+def build_workbook(tables, team_rankings, file_path="DraftSheet.xlsm", constant_memory=False):
+    # tables is {sheet name: DataFrame}, e.g. from ranking_table
+    # In constant memory mode every finished row is flushed to disk instead of the whole workbook
+    # being held until it is closed, for sheets with many players
     # Create a new Excel workbook
-    workbook = xlsxwriter.Workbook("DraftSheet.xlsm")
+    workbook = xlsxwriter.Workbook(file_path, {'constant_memory': constant_memory})
+
+    with profiling.stage("workbook render"):
+        write_sheets(workbook, tables, team_rankings)
+    profiling.count("formats", len(workbook.formats))
+
+    # Include the VBA macro script in your workbook
+    with profiling.stage("vba embed"):
+        workbook.add_vba_project('./vbaProject.bin')  # Assumes you have a vbaProject.bin file with the macro
+
+    # Close the workbook (saves it)
+    with profiling.stage("close"):
+        workbook.close()
 
+
+def write_sheets(workbook, tables, team_rankings):
+    # One sheet per table with all of its formatting, see build_workbook
     # Define cell formats
     base_format = workbook.add_format({
         'font_size': 14
@@ -305,28 +815,54 @@ if __name__ == '__main__':
     wr_format = workbook.add_format({'bg_color': '#CC99FF'})  # Purple for WR
     te_format = workbook.add_format({'bg_color': '#FF9900'})  # Orange for TE
 
-    for file_name in sorted(os.listdir("output")):
-        if not file_name.endswith(".csv"):
-            continue
+    # Team cells are colored by team rank (if they exist)
+    # Only one format is made per (color, bottom border), no matter how many cells use it
+    colors = team_colors(team_rankings) if len(team_rankings) > 0 else {}
+    team_formats = {}  # (bg_color, bottom) : format
+
+    def team_format(bg_color, bottom):
+        if (bg_color, bottom) not in team_formats:
+            team_formats[(bg_color, bottom)] = workbook.add_format({
+                'font_size': 14,
+                'bg_color': bg_color,
+                'bottom': bottom
+            })
+        return team_formats[(bg_color, bottom)]
 
-        # Load each CSV into a pandas DataFrame
-        df = pd.read_csv(os.path.join("output", file_name))
+    # One sheet per table, in alphabetical order
+    for worksheet_name in sorted(tables):
+        df = tables[worksheet_name]
 
         # Add a new sheet to the workbook
-        worksheet_name = file_name.split(".")[0]
         worksheet = workbook.add_worksheet(worksheet_name)
 
-        # Write headers and data to the worksheet
-        for i, col_name in enumerate(df.columns):
-            worksheet.write(0, i + 1, col_name)  # Write the header in B, C, D, ...
-            for j, value in enumerate(df[col_name]):
-                worksheet.write(j + 1, i + 1, value)  # Write the data in rows starting from B2
-
         # Apply the undrafted format to header row as well
         worksheet.set_row(0, None, undrafted_format)
+        worksheet.write_row(0, 1, df.columns)  # Write the header in B, C, D, ...
+
+        # Team cells are written along with the rest of their row, in their team's color
+        team_i = df.columns.get_loc("Team") if colors and "Team" in df.columns else None
+
+        # Write the data in rows starting from B2, strictly one row after another so that
+        # rows can be flushed to disk as they are finished in constant memory mode
+        for row_num, row in enumerate(df.itertuples(index=False), start=1):
+            # Apply the base format to each row initially,
+            # with a thick border to help estimate number of rounds
+            worksheet.set_row(row_num, cell_format=round_end_format if row_num % 12 == 0 else base_format)
+
+            if team_i is None:
+                worksheet.write_row(row_num, 1, row)
+            else:
+                team_name = row[team_i]
+                worksheet.write_row(row_num, 1, row[:team_i])
+                if team_name in colors:
+                    worksheet.write(row_num, team_i + 1, team_name,
+                                    team_format(colors[team_name], 0 if row_num % 12 else 2))
+                else:
+                    worksheet.write(row_num, team_i + 1, team_name)
+                worksheet.write_row(row_num, team_i + 2, row[team_i + 1:])
 
-        # Add a button in column A for each player
-        for row_num in range(1, len(df) + 1):
+            # Add a button in column A for each player
             worksheet.insert_button(f'A{row_num + 1}', {
                 'macro': 'ToggleDraftedStatus',
                 'caption': 'Draft',
@@ -336,22 +872,17 @@ if __name__ == '__main__':
                 'y_offset': 2
             })
 
-            # Apply the base format to each row initially
-            worksheet.set_row(row_num, cell_format=base_format)
-
-            # Apply a thick border to help estimate number of rounds
-            if row_num % 12 == 0:
-                worksheet.set_row(row_num, cell_format=round_end_format)
-
-            # Apply conditional formatting based on the value in column A of the current row
-            worksheet.conditional_format(f'B{row_num + 1}:Z{row_num + 1}', {
+        # Apply conditional formatting based on the value in column A of each row
+        # A single rule covers every row: the relative reference to $A2 moves along with the row
+        if len(df) > 0:
+            worksheet.conditional_format(f'B2:Z{len(df) + 1}', {
                 'type': 'formula',
-                'criteria': f'=LEN($A{row_num + 1})>0',
+                'criteria': '=LEN($A2)>0',
                 'format': drafted_format
             })
-            worksheet.conditional_format(f'B{row_num + 1}:Z{row_num + 1}', {
+            worksheet.conditional_format(f'B2:Z{len(df) + 1}', {
                 'type': 'formula',
-                'criteria': f'=LEN($A{row_num + 1})=0',
+                'criteria': '=LEN($A2)=0',
                 'format': undrafted_format
             })
 
@@ -389,57 +920,11 @@ if __name__ == '__main__':
             max_name_length = df["Name"].str.len().max()
             worksheet.set_column(1, 1, max_name_length + 2)  # Column 'B' (index 1)
 
-        # Apply conditional formatting to the "Team" column based on team rank (if they exist)
-        if len(team_rankings) > 0:
-            min_rank = min(team_rankings.values())
-            max_rank = max(team_rankings.values())
-
-            # Get 32 colors from GOOD_COLOR, NEUTRAL_COLOR, BAD_COLOR range
-            good_rgb = (int(GOOD_COLOR[1:3], 16), int(GOOD_COLOR[3:5], 16), int(GOOD_COLOR[5:7], 16))
-            neutral_rgb = (int(NEUTRAL_COLOR[1:3], 16), int(NEUTRAL_COLOR[3:5], 16), int(NEUTRAL_COLOR[5:7], 16))
-            bad_rgb = (int(BAD_COLOR[1:3], 16), int(BAD_COLOR[3:5], 16), int(BAD_COLOR[5:7], 16))
-            half_of_rankings = len(team_rankings) / 2
-            step_btwn_good_and_neutral = ((neutral_rgb[0] - good_rgb[0]) / half_of_rankings,
-                                          (neutral_rgb[1] - good_rgb[1]) / half_of_rankings,
-                                          (neutral_rgb[2] - good_rgb[2]) / half_of_rankings,)
-            step_btwn_neutral_and_bad = ((neutral_rgb[0] - bad_rgb[0]) / half_of_rankings,
-                                          (neutral_rgb[1] - bad_rgb[1]) / half_of_rankings,
-                                          (neutral_rgb[2] - bad_rgb[2]) / half_of_rankings,)
-            color_range = []
-            for i in range(len(team_rankings)):
-                if i < half_of_rankings:
-                    rgb = (round(good_rgb[0] + (i * step_btwn_good_and_neutral[0])),
-                           round(good_rgb[1] + (i * step_btwn_good_and_neutral[1])),
-                           round(good_rgb[2] + (i * step_btwn_good_and_neutral[2])))
-                    color_range.append(f"#{rgb[0]:02X}{rgb[1]:02X}{rgb[2]:02X}")
-                elif i == half_of_rankings:
-                    color_range.append(NEUTRAL_COLOR)
-                else:
-                    i -= round(half_of_rankings)
-                    rgb = (round(neutral_rgb[0] - (i * step_btwn_neutral_and_bad[0])),
-                           round(neutral_rgb[1] - (i * step_btwn_neutral_and_bad[1])),
-                           round(neutral_rgb[2] - (i * step_btwn_neutral_and_bad[2])))
-                    color_range.append(f"#{rgb[0]:02X}{rgb[1]:02X}{rgb[2]:02X}")
-
-            if "Team" in df.columns:
-                team_col_index = df.columns.get_loc("Team") + 1  # Adjust for xlsxwriter (1-based index)
-                for row_num in range(1, len(df) + 1):
-                    team_name = df.at[row_num - 1, "Team"]  # Get the team name for this row
-                    if team_name in team_rankings:
-                        # Determine color based on rank
-                        bg_color = color_range[team_rankings[team_name] - 1]
-                        team_format = workbook.add_format({
-                            'font_size': 14,
-                            'bg_color': bg_color,
-                            'bottom': 0 if row_num % 12 else 2
-                        })
-                        worksheet.write(row_num, team_col_index, team_name, team_format)
-
         # Apply heatmap to the columns except "Name", "Team", and "Position"
         for i, column_name in enumerate(df.columns):
             if column_name not in ["Name", "Team", "Position"]:
                 col_index = i + 1  # Adjusted index for xlsxwriter
-                if column_name == "Range":
+                if column_name in ("Range", "Pos. Rank"):
                     worksheet.conditional_format(1, col_index, len(df), col_index, {
                         'type': '3_color_scale',
                         'min_type': 'percentile',
@@ -452,6 +937,20 @@ if __name__ == '__main__':
                         'max_value': 100,
                         'max_color': BAD_COLOR
                     })
+                elif column_name.endswith("%"):
+                    # Chances from the simulation, 50% is neutral
+                    worksheet.conditional_format(1, col_index, len(df), col_index, {
+                        'type': '3_color_scale',
+                        'min_type': 'num',
+                        'min_value': 0,
+                        'min_color': BAD_COLOR,
+                        'mid_type': 'num',
+                        'mid_value': 50,
+                        'mid_color': NEUTRAL_COLOR,
+                        'max_type': 'num',
+                        'max_value': 100,
+                        'max_color': GOOD_COLOR
+                    })
                 else:
                     worksheet.conditional_format(1, col_index, len(df), col_index, {
                         'type': '3_color_scale',
@@ -464,12 +963,118 @@ if __name__ == '__main__':
                         'max_color': GOOD_COLOR
                     })
 
-    # Include the VBA macro script in your workbook
-    workbook.add_vba_project('./vbaProject.bin')  # Assumes you have a vbaProject.bin file with the macro
+        # Header and data cells, not counting the buttons
+        profiling.count("cells", (len(df) + 1) * len(df.columns))
+        profiling.count("buttons", len(df))
+        profiling.count("conditional formats", sum(len(rules) for rules in worksheet.cond_formats.values()))
 
-    # Close the workbook (saves it)
-    workbook.close()
 
-    print("Done")
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Create a fantasy football draft sheet from projections")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes to handle the position files on (default: 1)")
+    parser.add_argument("--csv", action="store_true",
+                        help="also write every sheet to output/{sheet}.csv")
+    parser.add_argument("--constant-memory", action="store_true",
+                        help="write the workbook a row at a time to keep memory flat for very large sheets")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="redo every stage even if its inputs haven't changed since the last run")
+    parser.add_argument("--simulate", type=int, default=0, metavar="SEASONS",
+                        help="add percentile, beat baseline and rank columns from this many simulated seasons")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed for --simulate (default: 0)")
+    parser.add_argument("--teams", type=int,
+                        help="work out the baselines from the league settings instead of BASELINE (default: 12)")
+    parser.add_argument("--roster",
+                        help="starting lineup for the league baselines (default: QB=1,RB=2,WR=2,TE=1,FLEX=1)")
+    parser.add_argument("--baseline-rounds", type=int,
+                        help="base the league baselines on the players taken in this many rounds instead")
+    parser.add_argument("--reader", choices=["csv", "pandas", "npy"], default="csv",
+                        help="how projection files are read: streamed with the csv module (default), all at once "
+                             "with pandas, or with pandas once and from a binary copy in .cache after that")
+    parser.add_argument("--profile", action="store_true",
+                        help="report the time and memory of every stage, also saved to notes/profile.json")
+    parser.add_argument("--cprofile", metavar="FILE",
+                        help="profile with cProfile as well and save its stats to FILE (implies --profile)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="trace Python allocations for the peak memory of every stage (implies --profile)")
+    args = parser.parse_args()
+    if args.simulate < 0:
+        parser.error("--simulate needs a positive number of seasons (0 leaves the simulation out)")
+
+    profile = args.profile or args.cprofile is not None or args.trace_memory
+    if profile:
+        profiling.PROFILER.start(cprofile=args.cprofile is not None, trace_memory=args.trace_memory)
+
+    cache = None if args.no_cache else BuildCache()
+    # Everything that goes into the workbook, if none of it changed since the last run there's nothing to do
+    with profiling.stage("cache check"):
+        build_key = hash_key(code_hash(), hash_dir("draft_platform_rankings"), hash_dir("fp_data"),
+                             hash_file(os.path.join("notes", "teams.csv")), hash_file("vbaProject.bin"),
+                             args.csv, args.constant_memory, args.simulate, args.seed, args.teams, args.roster,
+                             args.baseline_rounds)
+        workbook_hash = None if cache is None else cache.load("workbook", build_key)
+        nothing_changed = workbook_hash is not None and workbook_hash == hash_file("DraftSheet.xlsm")
+    if nothing_changed:
+        print("Done (nothing changed)")
+        if profile:
+            profiling.PROFILER.stop(os.path.join("notes", "profile.json"), args.cprofile)
+        sys.exit()
+
+    with profiling.stage("ranking ingest"):
+        platform_name, platform_rankings = load_platform_rankings("draft_platform_rankings")
+        name_index = NameIndex(platform_rankings)
+    league = None
+    baseline, position_limits = BASELINE, POSITION_LIMITS
+    if args.teams or args.roster or args.baseline_rounds:
+        from league import ROSTER, BaselineAllocator, League, parse_roster
+        try:
+            roster = parse_roster(args.roster) if args.roster else ROSTER
+        except ValueError as e:
+            parser.error(f"--roster: {e}")
+        league = League("DraftSheet", args.teams or 12, roster, baseline_rounds=args.baseline_rounds)
+        # The real baselines need the projections, until then load enough players for any of them
+        baseline = league.max_baseline()
+        position_limits = league.position_limits(baseline)
+
+    # With league settings or --simulate the CSVs are written once the final rankings are known
+    output_dir = "output" if args.csv else None
+    late_csv = league is not None or args.simulate
+    # Parse, score and rank every position, then the Overall sheet
+    # Players too far down their position to ever be shown are dropped while parsing
+    players, rankings = rank_files("fp_data", platform_name, name_index, None if late_csv else output_dir,
+                                   baseline=baseline, position_limits=position_limits, workers=args.workers,
+                                   cache=cache, reader=args.reader)
+    if league is not None:
+        with profiling.stage("league baselines"):
+            baseline = BaselineAllocator(players).baseline(league)
+            position_limits = league.position_limits(baseline)
+        print("Baselines: " + ", ".join(f"{position} {baseline[position]}" for position in POSITIONS))
+        with profiling.stage("ranking"):
+            rankings = rank_players(players, platform_name, baseline=baseline, position_limits=position_limits)
+    if args.simulate:
+        from simulation import add_simulation_columns, simulate
+        top = 12 if league is None else league.teams
+        with profiling.stage("simulation"):
+            add_simulation_columns(rankings, simulate(players, baseline=baseline, seasons=args.simulate,
+                                                      seed=args.seed, workers=args.workers, top=top), top)
+    if late_csv and output_dir is not None:
+        with profiling.stage("csv write"):
+            for position, (headers, rows) in rankings.items():
+                write_csv(os.path.join(output_dir, f"{position}.csv"), headers, rows)
+    # List every name that didn't match the platform exactly, so the guesses can be checked
+    with profiling.stage("name report"):
+        name_index.write_report(os.path.join("notes", "name_matches.csv"))
+
+    # parse team rankings
+    team_rankings = parse_team_rankings(os.path.join("notes", "teams.csv"))
 
+    with profiling.stage("tables"):
+        tables = {position: ranking_table(headers, rows) for position, (headers, rows) in rankings.items()}
+    build_workbook(tables, team_rankings, constant_memory=args.constant_memory)
+    if cache is not None:
+        cache.store("workbook", build_key, hash_file("DraftSheet.xlsm"))
 
+    if profile:
+        profiling.PROFILER.stop(os.path.join("notes", "profile.json"), args.cprofile)
+    print("Done")
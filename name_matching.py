@@ -0,0 +1,110 @@
+import csv
+import difflib
+import re
+from collections import defaultdict, namedtuple
+
+
+# Suffixes that one source will often have and the other won't
+SUFFIXES = {"jr", "sr", "ii", "iii", "iv"}
+
+# method is "exact", "normalized", "fuzzy" or "missing"
+# For a missing name, platform_name is the closest name found (if any), which wasn't close enough to use
+NameMatch = namedtuple("NameMatch", ["name", "platform_name", "confidence", "method"])
+
+
+def normalize_name(name):
+    # Lowercase without punctuation or suffixes, so "D.J. Moore Jr." and "DJ Moore" are the same name
+    words = re.sub(r"[^a-z0-9 ]", "", name.lower().replace("-", " ")).split()
+    return " ".join(word for word in words if word not in SUFFIXES)
+
+
+def normalize_position(position):
+    # "wr " and "WR" are the same position
+    return position.strip().upper()
+
+
+class NameIndex:
+    # Matches projection names to draft platform names
+    # Built once per platform rankings file and shared by every position. A lookup is a dict hit, or an
+    # edit distance comparison against the few platform names with the same last name, never all of them
+    # platform_rankings is {name: (overall_rank, position_rank, position)}, a guessed match has to be
+    # of the same position (rankings without the position are matched on the name alone)
+    def __init__(self, platform_rankings, min_confidence=0.8):
+        self.platform_rankings = platform_rankings
+        self.min_confidence = min_confidence
+        self.normalized = {}  # normalized name : platform name
+        self.positions = {}  # normalized name : platform position, if known
+        self.blocks = defaultdict(list)  # last name : [normalized names]
+        self.matches = []  # every NameMatch made, for the match report
+
+        for name in platform_rankings:
+            normalized = normalize_name(name)
+            # If two platform names normalize the same, the higher ranked one keeps it
+            if not normalized or normalized in self.normalized:
+                continue
+            self.normalized[normalized] = name
+            if len(platform_rankings[name]) > 2:
+                self.positions[normalized] = normalize_position(platform_rankings[name][2])
+            self.blocks[normalized.split()[-1]].append(normalized)
+
+    def __len__(self):
+        return len(self.platform_rankings)
+
+    def match(self, name, position=None):
+        match = self._match(name, position)
+        self.matches.append(match)
+        return match
+
+    def _match(self, name, position=None):
+        if name in self.platform_rankings:
+            return NameMatch(name, name, 1.0, "exact")
+        normalized = normalize_name(name)
+        if normalized in self.normalized:
+            return NameMatch(name, self.normalized[normalized], 1.0, "normalized")
+
+        # Only names with the same last name and first initial are close enough to compare,
+        # e.g. "Gabe Davis" and "Gabriel Davis", and only of the same position if both are known
+        position = normalize_position(position) if position else None
+        best_candidate = None
+        best_ratio = 0
+        if normalized:
+            for candidate in self.blocks.get(normalized.split()[-1], ()):
+                if candidate[0] != normalized[0]:
+                    continue
+                if position is not None and self.positions.get(candidate, position) != position:
+                    continue
+                ratio = difflib.SequenceMatcher(None, normalized, candidate).ratio()
+                if ratio > best_ratio:
+                    best_candidate, best_ratio = candidate, ratio
+
+        if best_candidate is None:
+            return NameMatch(name, None, 0.0, "missing")
+        platform_name = self.normalized[best_candidate]
+        if best_ratio < self.min_confidence:
+            return NameMatch(name, platform_name, best_ratio, "missing")
+        return NameMatch(name, platform_name, best_ratio, "fuzzy")
+
+    def ranking(self, match):
+        # Platform ranking for a match, (-1, -1) if there wasn't a good enough one
+        if match.method == "missing":
+            return -1, -1
+        return self.platform_rankings[match.platform_name]
+
+    def write_report(self, file_path):
+        # One row per name that didn't match exactly, least confident first
+        # A platform name given to more than one projection name is listed for all of them, exact or not,
+        # with the other names in "Shared With", since only one of them can really be that player
+        names = defaultdict(set)  # platform name : projection names matched to it
+        for match in self.matches:
+            if match.method != "missing":
+                names[match.platform_name].add(match.name)
+        matches = sorted((match for match in self.matches
+                          if match.method != "exact" or len(names[match.platform_name]) > 1),
+                         key=lambda m: m.confidence)
+        with open(file_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Name", "Platform Name", "Confidence", "Method", "Shared With"])
+            for match in matches:
+                shared = sorted(names[match.platform_name] - {match.name}) if match.method != "missing" else []
+                writer.writerow([match.name, match.platform_name or "", f"{match.confidence:.2f}", match.method,
+                                 "; ".join(shared)])
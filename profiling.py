@@ -0,0 +1,112 @@
+import cProfile
+import json
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is left out of the report there
+    resource = None
+
+
+def peak_rss_mb():
+    # Peak resident memory of this process so far
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes everywhere else
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Profiler:
+    # Wall time and memory of every pipeline stage, plus counts of what was made (rows, cells, formats...)
+    # Does nothing until started, so stages can be marked everywhere at no cost for normal runs
+    # Stages run in worker processes are timed by their own copy of the profiler and don't show up here
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}  # stage : {"calls", "seconds", "peak_rss_mb", "traced_peak_mb"}, in the order first run
+        self.counts = {}  # name : count
+        self.start_time = None
+        self.cprofile = None
+        self.trace_memory = False
+
+    def start(self, cprofile=False, trace_memory=False):
+        self.enabled = True
+        self.start_time = time.perf_counter()
+        self.trace_memory = trace_memory
+        if trace_memory:
+            tracemalloc.start()
+        if cprofile:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_rss_mb": None,
+                                                  "traced_peak_mb": None})
+            stage["calls"] += 1
+            stage["seconds"] += seconds
+            stage["peak_rss_mb"] = peak_rss_mb()
+            if self.trace_memory:
+                traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                stage["traced_peak_mb"] = max(stage["traced_peak_mb"] or 0, traced_peak)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def report(self):
+        return {
+            "wall_seconds": time.perf_counter() - self.start_time,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+            "counts": self.counts
+        }
+
+    def stop(self, report_path=None, cprofile_path=None):
+        # Prints the report, and saves it (and the cProfile stats) if given somewhere to
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        report = self.report()
+        if self.trace_memory:
+            tracemalloc.stop()
+
+        print(f"{'Stage':<24}{'Calls':>6}{'Seconds':>10}{'Peak RSS MB':>13}" +
+              (f"{'Traced MB':>11}" if self.trace_memory else ""))
+        for name, stage in report["stages"].items():
+            rss = "" if stage["peak_rss_mb"] is None else f"{stage['peak_rss_mb']:.1f}"
+            print(f"{name:<24}{stage['calls']:>6}{stage['seconds']:>10.3f}{rss:>13}" +
+                  (f"{stage['traced_peak_mb']:>11.1f}" if self.trace_memory else ""))
+        rss = "" if report["peak_rss_mb"] is None else f", peak RSS {report['peak_rss_mb']:.1f} MB"
+        print(f"Total {report['wall_seconds']:.3f}s{rss}")
+        if report["counts"]:
+            print(", ".join(f"{count} {name}" for name, count in report["counts"].items()))
+
+        if report_path is not None:
+            with open(report_path, "w") as f:
+                json.dump(report, f, indent=2)
+        if self.cprofile is not None:
+            if cprofile_path is not None:
+                self.cprofile.dump_stats(cprofile_path)
+            pstats.Stats(self.cprofile).sort_stats("cumulative").print_stats(20)
+        return report
+
+
+# Shared by the whole pipeline, started by main.py --profile
+PROFILER = Profiler()
+stage = PROFILER.stage
+count = PROFILER.count
@@ -0,0 +1,165 @@
+import json
+import math
+import os
+from array import array
+
+import numpy as np
+import pandas as pd
+
+import profiling
+from rebuild_cache import hash_file
+
+# Version of the files ProjectionStore writes, stored files of any other version are read again
+STORE_VERSION = 1
+
+
+class ProjectionTable:
+    # A whole projection file as arrays, one row per projection row of the file (average, high or low)
+    # names and teams have one entry per player, row_players and row_tiers say whose row each one is and
+    # of which tier, and values is rows x stats with NaN where a stat has no projection
+    def __init__(self, names, teams, row_players, row_tiers, stats, values):
+        self.names = names
+        self.teams = teams
+        self.row_players = row_players
+        self.row_tiers = row_tiers
+        self.stats = stats
+        self.values = values
+
+    def top_players(self, keep, weights):
+        # Indexes of the `keep` players with the best average score, the same players top_records would keep
+        # Scores are summed a stat at a time in the file's column order like PPR.score_row, so they come out
+        # exactly the same
+        scores = np.zeros(len(self.values))
+        for i, stat in enumerate(self.stats):
+            column = np.asarray(self.values[:, i])
+            scores += np.where(np.isnan(column), 0, column * weights[stat])
+        has_stats = self._has_stats()
+        average = np.full(len(self.names), -np.inf)  # players without an average projection go last
+        for i, (player, tier) in enumerate(zip(self.row_players, self.row_tiers)):
+            if tier == "average":
+                average[player] = scores[i] if has_stats[i] else -np.inf
+        # Best first, ties go to the earlier player
+        return sorted(np.lexsort((np.arange(len(self.names)), -average))[:keep].tolist())
+
+    def _has_stats(self):
+        if not self.stats:
+            return [False] * len(self.values)
+        return (~np.isnan(self.values).all(axis=1)).tolist()
+
+    def records(self, stat_columns, players=None):
+        # Same records as iter_projection_records: (player_name, team, {projection_type: row}, stat_order),
+        # each row an array('d') laid out by stat_columns, or None if it has no stats at all
+        # players optionally limits the records to those player indexes (see top_players)
+        columns = [stat_columns.column(stat) for stat in self.stats]
+        width = len(stat_columns)
+        full = np.full((len(self.values), width), math.nan)
+        full[:, columns] = self.values
+        has_stats = self._has_stats()
+        stat_order = tuple(self.stats)
+        selected = None if players is None else set(players)
+        # Rows are sliced out of one array('d'), much quicker than converting them from numpy one by one
+        all_rows = array('d')
+        all_rows.frombytes(full.tobytes())
+        profiling.count("projection rows", len(self.values))
+
+        record = None
+        for i, (player, tier) in enumerate(zip(self.row_players, self.row_tiers)):
+            if selected is not None and player not in selected:
+                continue
+            if record is None or player != record[0]:
+                if record is not None:
+                    yield self.names[record[0]], self.teams[record[0]], record[1], stat_order
+                record = (player, {})
+            record[1][tier] = all_rows[i * width:(i + 1) * width] if has_stats[i] else None
+        if record is not None:
+            yield self.names[record[0]], self.teams[record[0]], record[1], stat_order
+
+
+def read_pandas(file_path):
+    # Reads a projection file in one go with pandas, thousands separators and all, into a ProjectionTable
+    # The layout is the same one iter_projection_records reads: a header, a garbage row, then an average
+    # row starting with the player's name followed by rows marked "high" and "low" in the team column
+    # round_trip parses every number exactly like float() does
+    df = pd.read_csv(file_path, skiprows=[1], thousands=",", float_precision="round_trip")
+    # Empty rows at the bottom
+    df = df.dropna(how="all")
+    headers = df.columns.tolist()
+
+    # The numbers are parsed in bulk above, the two text columns are quicker as plain lists than with .str
+    names, teams, row_players, row_tiers = [], [], [], []
+    keep = []  # rows that belong to a player
+    tier = None
+    for name, team in zip(df[headers[0]].fillna("").astype(str).tolist(), df[headers[1]].fillna("").tolist()):
+        name = name.strip()
+        if name:  # New player entry
+            names.append(name)
+            teams.append(team.replace("high", ""))
+            tier = "average"
+        elif "high" in team:
+            tier = "high"
+        elif "low" in team:
+            tier = "low"
+        # Rows before the first player belong to nobody
+        keep.append(bool(names))
+        if names:
+            row_players.append(len(names) - 1)
+            row_tiers.append(tier)
+
+    # Ignore "FPTS", and the Player and Team columns
+    stats = [header for header in headers if header not in ("FPTS")][2:]
+    values = df[stats].to_numpy(dtype=float)[keep] if stats else np.empty((len(row_players), 0))
+    return ProjectionTable(names, teams, row_players, row_tiers, stats, values)
+
+
+class ProjectionStore:
+    # Binary copy of every projection file read, so later runs (and other tools) don't parse any text
+    # The values are a plain .npy file that is memory mapped when loaded, the rest is a small json file
+    # Files are stored by the hash of their contents, so an edited file is simply a new entry
+    def __init__(self, store_dir=os.path.join(".cache", "projections"), reader=read_pandas):
+        self.store_dir = store_dir
+        self.reader = reader
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _paths(self, file_path):
+        key = hash_file(file_path)
+        return os.path.join(self.store_dir, key + ".npy"), os.path.join(self.store_dir, key + ".json")
+
+    def load(self, file_path):
+        # The stored table for file_path, or None if there isn't one
+        values_path, info_path = self._paths(file_path)
+        try:
+            with open(info_path) as f:
+                info = json.load(f)
+            if info.get("version") != STORE_VERSION:
+                return None
+            values = np.load(values_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        return ProjectionTable(info["names"], info["teams"], info["row_players"], info["row_tiers"], info["stats"],
+                               values)
+
+    def store(self, file_path, table):
+        values_path, info_path = self._paths(file_path)
+        # Written next to their final name and then renamed, so a stored file is never half written
+        with open(values_path + ".tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(table.values, dtype=np.float64))
+        os.replace(values_path + ".tmp", values_path)
+        with open(info_path + ".tmp", "w") as f:
+            json.dump({"version": STORE_VERSION, "names": table.names, "teams": table.teams,
+                       "row_players": table.row_players, "row_tiers": table.row_tiers, "stats": table.stats}, f)
+        os.replace(info_path + ".tmp", info_path)
+
+    def read(self, file_path):
+        table = self.load(file_path)
+        if table is None:
+            table = self.reader(file_path)
+            self.store(file_path, table)
+        return table
+
+
+# Readers that give a ProjectionTable, by the name used on the command line
+# "csv" is iter_projection_records in main.py, which streams records without building a table
+TABLE_READERS = {
+    "pandas": read_pandas,
+    "npy": lambda file_path: ProjectionStore().read(file_path)
+}
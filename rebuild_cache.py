@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+import pickle
+
+
+def hash_file(file_path):
+    # None for a missing file, so a file appearing or disappearing counts as a change too
+    try:
+        with open(file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def hash_dir(dir_path, suffix=".csv"):
+    return {f: hash_file(os.path.join(dir_path, f)) for f in sorted(os.listdir(dir_path)) if f.endswith(suffix)}
+
+
+def hash_key(*parts):
+    # One hash over anything json can represent (scoring weights, baselines, other hashes, ...)
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class BuildCache:
+    # Results of pipeline stages, each kept along with the hash of everything it was computed from
+    # manifest.json has the current key of every stage, the results are pickled next to it
+    def __init__(self, cache_dir=".cache"):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        try:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.manifest = {}
+
+    def _path(self, stage):
+        return os.path.join(self.cache_dir, hashlib.sha256(stage.encode()).hexdigest()[:16] + ".pickle")
+
+    def load(self, stage, key):
+        # Result of the stage, or None if it was last computed from different inputs
+        if self.manifest.get(stage) != key:
+            return None
+        try:
+            with open(self._path(stage), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Unreadable, or pickled from classes that no longer exist
+            return None
+
+    def store(self, stage, key, value):
+        with open(self._path(stage), "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.manifest[stage] = key
+        # Replace the manifest in one go, so an interrupted run can't leave half of it behind
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
@@ -0,0 +1,63 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from main import (BASELINE, POSITION_LIMITS, POSITIONS, PPR, ProjectionMatrix, load_platform_rankings,
+                  load_projections, rank_players)
+
+
+class Scenario:
+    # One league configuration: a scoring system, the baseline for every position and how many players to show
+    def __init__(self, name, scoring=PPR, baseline=BASELINE, position_limits=POSITION_LIMITS):
+        self.name = name
+        self.scoring = scoring
+        self.baseline = baseline
+        self.position_limits = position_limits
+
+    def __repr__(self):
+        return f"Scenario({self.name} {self.scoring.__name__})"
+
+
+def score_scenarios(players, scenarios):
+    # Score every scoring system used by the scenarios with one matrix product,
+    # the results are cached on the players so ranking a scenario doesn't rescore anyone
+    scorings = list(dict.fromkeys(scenario.scoring for scenario in scenarios))
+    matrix = ProjectionMatrix(player for position in POSITIONS for player in players[position].values())
+    scores = matrix.score(scorings)  # players x tiers x scorings
+    for player, player_scores in zip(matrix.players, scores.transpose(0, 2, 1).tolist()):
+        for scoring, score in zip(scorings, player_scores):
+            player.cache_score(scoring, tuple(None if np.isnan(value) else value for value in score))
+
+
+# Set once per worker process so the player pool is only sent over once, not for every scenario
+_worker_players = None
+_worker_platform_name = None
+
+
+def _init_worker(players, platform_name):
+    global _worker_players, _worker_platform_name
+    _worker_players = players
+    _worker_platform_name = platform_name
+
+
+def _rank_scenario(scenario):
+    return scenario.name, rank_players(_worker_players, _worker_platform_name, scenario.scoring,
+                                       scenario.baseline, scenario.position_limits)
+
+
+def run_scenarios(scenarios, players=None, platform_name=None, workers=None,
+                  data_dir="fp_data", ranking_data_dir="draft_platform_rankings"):
+    # Rank every scenario from a single parse of the projections
+    # Returns {scenario name: rankings}, see rank_players for the layout of the rankings
+    if players is None:
+        platform_name, platform_rankings = load_platform_rankings(ranking_data_dir)
+        players = load_projections(data_dir, platform_rankings)
+
+    score_scenarios(players, scenarios)
+
+    if workers:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(players, platform_name)) as pool:
+            return dict(pool.map(_rank_scenario, scenarios))
+    return {scenario.name: rank_players(players, platform_name, scenario.scoring,
+                                        scenario.baseline, scenario.position_limits)
+            for scenario in scenarios}
@@ -0,0 +1,100 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from main import BASELINE, POSITIONS, PPR, score_players
+
+# Low and high projections are treated as the 10th and 90th percentile of a player's season
+Z_90 = 1.2815515655446004
+
+# Seasons simulated at once, each chunk has its own random stream so results don't depend on the number of workers
+CHUNK_SIZE = 2000
+
+# Columns added to every sheet, in order
+SIMULATION_HEADERS = ["P10", "P50", "P90", "Beat %", "Pos. Rank", "Top {top} %"]
+
+
+def fit_projections(players, scoring=PPR):
+    # Fits a split normal to every player's (low, avg, high) per game score: centered on the average,
+    # with the low and high projections as the 10th and 90th percentiles
+    # A missing low or high tier means no spread on that side
+    scores = score_players(players, scoring)
+    tiers = np.array([scores[player] for player in players], dtype=float).reshape(len(players), 3)  # None is NaN
+    mean = tiers[:, 1]
+    low = np.where(np.isnan(tiers[:, 0]), mean, tiers[:, 0])
+    high = np.where(np.isnan(tiers[:, 2]), mean, tiers[:, 2])
+    # Experts don't always agree on which side of the average is which, a negative spread is treated as none
+    sigma_low = np.maximum(mean - low, 0) / Z_90
+    sigma_high = np.maximum(high - mean, 0) / Z_90
+    return mean, sigma_low, sigma_high
+
+
+def _simulate_chunk(task):
+    # Simulates `seasons` seasons for every player at once
+    # Returns (values, ranks): seasons x players arrays of points over that season's baseline player
+    # and rank within the position
+    mean, sigma_low, sigma_high, blocks, seasons, seed = task
+    rng = np.random.default_rng(seed)
+    z = rng.standard_normal((seasons, len(mean)))
+    samples = mean + z * np.where(z < 0, sigma_low, sigma_high)
+
+    values = np.empty(samples.shape, dtype=np.float32)
+    ranks = np.empty(samples.shape, dtype=np.uint16)
+    for start, stop, baseline_index in blocks:
+        block = samples[:, start:stop]
+        # Best player of the season first
+        order = np.argsort(-block, axis=1, kind="stable")
+        # The baseline is whoever ends up at the baseline spot that season, not a fixed player
+        baseline = np.take_along_axis(block, order[:, baseline_index:baseline_index + 1], axis=1)
+        values[:, start:stop] = block - baseline
+        np.put_along_axis(ranks[:, start:stop], order, np.arange(1, stop - start + 1, dtype=np.uint16), axis=1)
+    return values, ranks
+
+
+def simulate(players, scoring=PPR, baseline=BASELINE, seasons=10000, seed=None, workers=1, top=12):
+    # Monte Carlo version of the rankings: every player's season is drawn from the split normal fitted
+    # to their projections, and compared against the baseline spot of their position in that same season
+    # Returns {(position, player name): (p10, p50, p90, beat %, median position rank, top %)}
+    # where the percentiles are points over baseline and "top" is finishing in the top `top` of the position
+    if seasons < 1:
+        raise ValueError(f"Can't simulate {seasons} seasons, it needs at least 1")
+    pool = []
+    blocks = []  # (first column, last column + 1, baseline index) of every position
+    for position in POSITIONS:
+        position_players = list(players[position].values())
+        if position_players:
+            blocks.append((len(pool), len(pool) + len(position_players),
+                           min(baseline[position], len(position_players) - 1)))
+            pool.extend(position_players)
+    mean, sigma_low, sigma_high = fit_projections(pool, scoring)
+
+    # One independent random stream per chunk
+    sizes = [min(CHUNK_SIZE, seasons - start) for start in range(0, seasons, CHUNK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(mean, sigma_low, sigma_high, blocks, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(workers) as pool_executor:
+            chunks = list(pool_executor.map(_simulate_chunk, tasks))
+    else:
+        chunks = [_simulate_chunk(task) for task in tasks]
+    values = np.concatenate([chunk[0] for chunk in chunks])
+    ranks = np.concatenate([chunk[1] for chunk in chunks])
+
+    p10, p50, p90 = np.percentile(values, [10, 50, 90], axis=0)
+    beat = (values > 0).mean(axis=0) * 100
+    median_rank = np.median(ranks, axis=0)
+    top_share = (ranks <= top).mean(axis=0) * 100
+    return {(player.position, player.name): result
+            for player, result in zip(pool, zip(*(column.tolist()
+                                                 for column in (p10, p50, p90, beat, median_rank, top_share))))}
+
+
+def add_simulation_columns(rankings, results, top=12):
+    # Adds the simulation results to the end of every row of rankings (see rank_players for the layout)
+    headers = [header.format(top=top) for header in SIMULATION_HEADERS]
+    for sheet, (sheet_headers, rows) in rankings.items():
+        # The position is the sheet for positional sheets, and its own column on combined ones
+        rankings[sheet] = (sheet_headers + headers,
+                           [row + results[(sheet if sheet in POSITIONS else row[1], row[0])]
+                            for row in rows])
+    return rankings
@@ -0,0 +1,144 @@
+import argparse
+import csv
+import os
+import random
+
+from main import POSITIONS
+
+# Columns of every FantasyPros projection file, in the order they come in
+COLUMNS = {
+    "QB": ["PASS_ATT", "PASS_CMP", "PASS_YDS", "PASS_TDS", "PASS_INTS", "RUSH_ATT", "RUSH_YDS", "RUSH_TDS", "FL"],
+    "RB": ["RUSH_ATT", "RUSH_YDS", "RUSH_TDS", "REC", "REC_YDS", "REC_TDS", "FL"],
+    "WR": ["REC", "REC_YDS", "REC_TDS", "RUSH_ATT", "RUSH_YDS", "RUSH_TDS", "FL"],
+    "TE": ["REC", "REC_YDS", "REC_TDS", "FL"]
+}
+
+# Season projection of the best player at each position, everyone else gets less
+TOP_PROJECTIONS = {
+    "QB": {"PASS_ATT": 600, "PASS_CMP": 400, "PASS_YDS": 4600, "PASS_TDS": 36, "PASS_INTS": 10,
+           "RUSH_ATT": 90, "RUSH_YDS": 500, "RUSH_TDS": 5, "FL": 3},
+    "RB": {"RUSH_ATT": 300, "RUSH_YDS": 1400, "RUSH_TDS": 13, "REC": 60, "REC_YDS": 500, "REC_TDS": 3, "FL": 2},
+    "WR": {"REC": 115, "REC_YDS": 1600, "REC_TDS": 12, "RUSH_ATT": 12, "RUSH_YDS": 70, "RUSH_TDS": 1, "FL": 1},
+    "TE": {"REC": 95, "REC_YDS": 1100, "REC_TDS": 9, "FL": 1}
+}
+
+TEAMS = ["KC", "BUF", "SF", "DAL", "PHI", "MIA", "CIN", "BAL", "DET", "GB", "LAR", "NYJ", "SEA", "MIN", "LV", "JAX",
+         "ATL", "NO", "TB", "CAR", "CHI", "DEN", "LAC", "PIT", "CLE", "HOU", "IND", "TEN", "NE", "NYG", "WAS", "ARI"]
+
+FIRST_NAMES = ["Aaron", "Amon-Ra", "Austin", "Brandon", "Breece", "Bryce", "Calvin", "CeeDee", "Chris", "Christian",
+               "Dak", "Dalton", "Darren", "David", "Davante", "DeVonta", "DJ", "Drake", "Garrett", "George", "Isiah",
+               "Jahmyr", "Jalen", "Ja'Marr", "James", "Jaylen", "Joe", "Jonathan", "Josh", "Justin", "Kenneth",
+               "Kyle", "Kyren", "Lamar", "Mark", "Marvin", "Michael", "Mike", "Najee", "Nico", "Puka", "Rachaad",
+               "Rashee", "Saquon", "Sam", "Stefon", "Tank", "Tee", "Terry", "Travis", "Trey", "Tyreek", "Zay"]
+
+# Last names are made up from these, so there are enough of them at any scale
+SYLLABLES = ["al", "an", "bar", "ber", "bo", "cam", "car", "da", "del", "don", "el", "fer", "gan", "ham", "har",
+             "jack", "ken", "kin", "la", "lee", "len", "lock", "mar", "mon", "mor", "nel", "ney", "o", "per", "ri",
+             "rob", "ros", "sen", "son", "ta", "ter", "ton", "van", "wil", "win"]
+
+SUFFIXES = ["Jr.", "Sr.", "II", "III"]
+
+
+def make_name(rng, used):
+    # A new two word name, sometimes with a suffix
+    while True:
+        last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        name = f"{rng.choice(FIRST_NAMES)} {last}"
+        if rng.random() < 0.08:
+            name += " " + rng.choice(SUFFIXES)
+        if name not in used:
+            used.add(name)
+            return name
+
+
+def platform_name_for(rng, name):
+    # How the draft platform might write the same name, so name matching has some work to do
+    roll = rng.random()
+    if roll < 0.1:
+        # Suffix left out
+        return " ".join(part for part in name.split(" ") if part not in SUFFIXES)
+    if roll < 0.15:
+        return name.replace(".", "").replace("'", "")
+    return name
+
+
+def write_projections(file_path, position, players, rng):
+    # Header, garbage row, then an average, high and low row per player, and empty rows at the end
+    columns = COLUMNS[position]
+    with open(file_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Player", "Team"] + columns + ["FPTS"])
+        writer.writerow([""] * (len(columns) + 3))
+        for name, team, share in players:
+            average = {stat: TOP_PROJECTIONS[position][stat] * share * rng.uniform(0.85, 1.15) for stat in columns}
+            for tier, factor in (("", 1.0), ("high", rng.uniform(1.1, 1.4)), ("low", rng.uniform(0.6, 0.9))):
+                writer.writerow([name if tier == "" else "", team if tier == "" else tier] +
+                                [f"{average[stat] * factor:,.1f}" for stat in columns] + ["0"])
+        writer.writerow([""])
+        writer.writerow([""])
+
+
+# Folders generate writes to inside its output folder, the same ones main.py reads
+FOLDERS = ("fp_data", "draft_platform_rankings", "notes")
+
+
+def generate(output_dir, players_per_position=150, seed=0, platform_name="ESPN", force=False):
+    # Writes made up projections for every position, draft platform rankings for them and team rankings,
+    # in the same layout as the real files, to fp_data, draft_platform_rankings and notes in output_dir
+    # Any CSV already in those folders would be read together with the made up ones (or be overwritten),
+    # so unless forced nothing is written if there is one
+    folders = [os.path.join(output_dir, folder) for folder in FOLDERS]
+    if not force:
+        for folder in folders:
+            if os.path.isdir(folder) and any(f.endswith(".csv") for f in os.listdir(folder)):
+                raise FileExistsError(f"{folder} already has CSV files in it")
+    for folder in folders:
+        os.makedirs(folder, exist_ok=True)
+    data_dir, ranking_data_dir, notes_dir = folders
+
+    rng = random.Random(seed)
+    used = set()
+    ranked = []  # (platform sort key, name, position)
+    for position in POSITIONS:
+        players = []
+        for i in range(players_per_position):
+            # Projections fall off quickly at the top and slowly further down
+            share = 1 / (1 + i / 12) ** 0.8
+            name = make_name(rng, used)
+            players.append((name, rng.choice(TEAMS), share))
+            # The platform mostly agrees with the projections, but not always
+            ranked.append((share * rng.lognormvariate(0, 0.25) * (1.2 if position in ("RB", "WR") else 1.0),
+                           name, position))
+        write_projections(os.path.join(data_dir, f"FantasyPros_Projections_{position}.csv"), position, players, rng)
+
+    ranked.sort(reverse=True)
+    with open(os.path.join(ranking_data_dir, "rankings.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Position", platform_name])
+        rank = 0
+        for _, name, position in ranked:
+            # A few players are missing from the platform altogether
+            if rng.random() < 0.03:
+                continue
+            rank += 1
+            writer.writerow([platform_name_for(rng, name), position, rank])
+
+    with open(os.path.join(notes_dir, "teams.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Team"])
+        for team in rng.sample(TEAMS, len(TEAMS)):
+            writer.writerow([team])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write made up projections and rankings to try the sheet with")
+    parser.add_argument("output_dir", help="folder to write fp_data, draft_platform_rankings and notes to")
+    parser.add_argument("--players", type=int, default=150, help="players per position (default: 150)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--force", action="store_true",
+                        help="write even if the folders already have CSV files, which may be overwritten")
+    args = parser.parse_args()
+    try:
+        generate(args.output_dir, args.players, args.seed, force=args.force)
+    except FileExistsError as e:
+        parser.error(f"{e}, pass --force to write there anyway")
@@ -0,0 +1,29 @@
+import contextlib
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import generate  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def dataset(tmp_path_factory):
+    # Made up fp_data, draft_platform_rankings and notes, the same for every test
+    data_dir = tmp_path_factory.mktemp("data")
+    generate(str(data_dir), players_per_position=300, seed=1)
+    return str(data_dir)
+
+
+@pytest.fixture(scope="session")
+def players(dataset):
+    from main import load_platform_rankings, load_projections
+    from name_matching import NameIndex
+    # Names missing from the rankings are printed while parsing
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        platform_name, platform_rankings = load_platform_rankings(os.path.join(dataset, "draft_platform_rankings"))
+        return load_projections(os.path.join(dataset, "fp_data"), platform_rankings,
+                                name_index=NameIndex(platform_rankings))
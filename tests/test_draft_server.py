@@ -0,0 +1,127 @@
+import asyncio
+import base64
+import hashlib
+import json
+from urllib.parse import quote
+
+import pytest
+
+from draft_server import (RESPONSE_CACHE_SIZE, WEBSOCKET_GUID, DraftBoard, read_websocket_frame, start_server,
+                          websocket_frame)
+
+
+@pytest.fixture(scope="module")
+def board(players):
+    return DraftBoard(players, "ESPN")
+
+
+async def request(port, method, path, body=b"", headers=None):
+    # One HTTP request, returns (status code, parsed JSON body)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    headers = {"Content-Length": str(len(body)), **(headers or {})}
+    writer.write(f"{method} {path} HTTP/1.1\r\n".encode() +
+                 "".join(f"{key}: {value}\r\n" for key, value in headers.items()).encode() + b"\r\n" + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(content) if content else None
+
+
+async def raw_request(port, data):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+async def open_websocket(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    key = base64.b64encode(b"0123456789abcdef").decode()
+    writer.write(f"GET /ws HTTP/1.1\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                 f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest())
+    assert head.startswith(b"HTTP/1.1 101 ")
+    assert b"Sec-WebSocket-Accept: " + accept in head
+    return reader, writer
+
+
+def run_with_server(board, test):
+    async def main():
+        server = await start_server(board)
+        try:
+            await test(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await server.wait_closed()
+    asyncio.run(main())
+
+
+def test_pick_is_broadcast_and_shown_drafted(board):
+    async def test(port):
+        ws_reader, ws_writer = await open_websocket(port)
+        # Give the server a moment to register the client before the pick
+        await asyncio.sleep(0.05)
+
+        status, page = await request(port, "GET", "/api/sheets/Overall?limit=1")
+        assert status == 200
+        top = page["rows"][0]
+        assert not top["Drafted"]
+        status, player = await request(port, "POST", "/api/picks",
+                                       json.dumps({"name": top["Name"], "position": top["Pos."]}).encode())
+        assert status == 200
+        assert player == {"Name": top["Name"], "Pos.": top["Pos."]}
+
+        opcode, payload = await asyncio.wait_for(read_websocket_frame(ws_reader), 5)
+        message = json.loads(payload)
+        assert opcode == 0x1
+        assert message["type"] == "pick"
+        assert message["picks"] == 1
+        assert message["player"]["Name"] == top["Name"]
+
+        for sheet in ("Overall", top["Pos."]):
+            status, page = await request(port, "GET", f"/api/sheets/{sheet}?name={quote(top['Name'])}")
+            assert [row["Drafted"] for row in page["rows"] if row["Name"] == top["Name"]] == [True]
+        status, best = await request(port, "GET", "/api/best?n=1")
+        assert best["players"][0]["Name"] != top["Name"]
+
+        status, _ = await request(port, "POST", "/api/undo", json.dumps({"name": top["Name"]}).encode())
+        assert status == 200
+        opcode, payload = await asyncio.wait_for(read_websocket_frame(ws_reader), 5)
+        assert json.loads(payload)["type"] == "undo"
+
+        ws_writer.write(websocket_frame(b"", 0x8))
+        await ws_writer.drain()
+        ws_writer.close()
+
+    run_with_server(board, test)
+
+
+def test_bad_requests(board):
+    async def test(port):
+        assert (await raw_request(port, b"NONSENSE\r\n\r\n")).startswith(b"HTTP/1.1 400 ")
+        assert (await raw_request(port, b"POST /api/picks HTTP/1.1\r\nContent-Length: lots\r\n\r\n")
+                ).startswith(b"HTTP/1.1 400 ")
+        assert (await raw_request(port, b"POST /api/picks HTTP/1.1\r\nContent-Length: 100000000\r\n\r\n")
+                ).startswith(b"HTTP/1.1 413 ")
+        assert (await raw_request(port, b"GET /ws HTTP/1.1\r\nUpgrade: websocket\r\n\r\n")
+                ).startswith(b"HTTP/1.1 400 ")
+        for body in (b"{}", b"[]", b"not json", b'{"name": 3}', b'{"name": "x", "position": 3}'):
+            status, response = await request(port, "POST", "/api/picks", body)
+            assert status == 400
+            assert response["error"]
+        status, _ = await request(port, "POST", "/api/picks", b'{"name": "Nobody At All"}')
+        assert status == 404
+
+    run_with_server(board, test)
+
+
+def test_response_cache_is_bounded(board):
+    for offset in range(RESPONSE_CACHE_SIZE * 2):
+        board.cached(("/api/sheets/Overall", f"offset={offset}"),
+                     lambda: board.sheet_page("Overall", {"offset": str(offset)}))
+    assert len(board.response_cache) == RESPONSE_CACHE_SIZE
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from draft_session import DraftSession, RemainingIndex
+from main import POSITIONS, get_baseline_projections
+
+# Small baselines, so the random picks move them and run some positions out of players below them
+BASELINE = {"QB": 4, "TE": 4, "RB": 10, "WR": 10}
+
+
+def brute_force(session, drafted):
+    # Baselines and Overall order worked out from scratch by sorting everything that's left
+    baseline_players = {}
+    overall = []
+    for order, position in enumerate(POSITIONS):
+        ranked = session.sorted_players[position]
+        left = [(i, player) for i, player in enumerate(ranked) if (position, player.name) not in drafted]
+        if not left:
+            baseline_players[position] = None
+            continue
+        taken = len(ranked) - len(left)
+        baseline_player = left[min(max(BASELINE[position] - taken, 0), len(left) - 1)][1]
+        baseline_players[position] = baseline_player
+        offset = session.scores[baseline_player][1]
+        overall += [((offset - session.scores[player][1], order, i), player) for i, player in left]
+    return baseline_players, [player for _, player in sorted(overall, key=lambda entry: entry[0])]
+
+
+def test_remaining_index():
+    rng = random.Random(0)
+    remaining = RemainingIndex(37)
+    left = [True] * 37
+    for _ in range(300):
+        i = rng.randrange(37)
+        remaining.add(i, -1 if left[i] else 1)
+        left[i] = not left[i]
+        indexes = [j for j in range(37) if left[j]]
+        for j in range(38):
+            assert remaining.count_before(j) == sum(left[:j])
+        for k in range(len(indexes) + 1):
+            assert remaining.find(k) == (indexes[k] if k < len(indexes) else None)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_session_matches_brute_force(players, seed):
+    # Small pools, so positions do run out
+    pool = {position: dict(list(players[position].items())[:30]) for position in POSITIONS}
+    session = DraftSession(pool, baseline=BASELINE)
+    rng = random.Random(seed)
+    drafted = []  # (position, name)
+    for _ in range(200):
+        if drafted and rng.random() < 0.3:
+            position, name = drafted.pop(rng.randrange(len(drafted)))
+            session.undo(name, position)
+        else:
+            left = [(position, name) for position in POSITIONS for name in pool[position]
+                    if (position, name) not in drafted]
+            if not left:
+                continue
+            position, name = rng.choice(left)
+            session.pick(name, position)
+            drafted.append((position, name))
+
+        baseline_players, overall = brute_force(session, set(drafted))
+        assert session.baseline_players == baseline_players
+        best = session.best_available(len(overall) + 1)
+        assert [player for player, _ in best] == overall
+        for player, relative in best:
+            assert relative == get_baseline_projections(session.scores[player],
+                                                        session.scores[baseline_players[player.position]])
+        for rank, player in enumerate(overall, 1):
+            assert session.overall_rank(player.name, player.position) == rank
+        for position in POSITIONS:
+            expected = [player for player in overall if player.position == position][:5]
+            assert [player for player, _ in session.best_available(5, position)] == expected
+
+
+def test_pick_errors(players):
+    session = DraftSession(players)
+    name = next(iter(players["QB"]))
+    with pytest.raises(ValueError):
+        session.undo(name, "QB")
+    session.pick(name, "QB")
+    with pytest.raises(ValueError):
+        session.pick(name, "QB")
+    with pytest.raises(KeyError):
+        session.pick("Nobody At All")
@@ -0,0 +1,64 @@
+import pytest
+
+from league import FLEX_SLOTS, BaselineAllocator, League, parse_roster
+from main import POSITIONS, score_players
+
+
+def greedy_starters(players, league):
+    # Fills the lineups one player at a time straight from the sorted pool: dedicated slots first,
+    # then every flex slot takes the best player left of any position it allows
+    scores = score_players([player for position in POSITIONS for player in players[position].values()])
+    left = sorted((player for position in POSITIONS for player in players[position].values()),
+                  key=lambda player: (-scores[player][1], POSITIONS.index(player.position)))
+    counts = dict.fromkeys(POSITIONS, 0)
+    for position in POSITIONS:
+        slots = league.teams * league.roster.get(position, 0)
+        for player in [player for player in left if player.position == position][:slots]:
+            left.remove(player)
+            counts[position] += 1
+    for slot, eligible in FLEX_SLOTS.items():
+        # Ties go to the position listed first in the slot
+        candidates = sorted((player for player in left if player.position in eligible),
+                            key=lambda player: (-scores[player][1], eligible.index(player.position)))
+        for player in candidates[:league.teams * league.roster.get(slot, 0)]:
+            left.remove(player)
+            counts[player.position] += 1
+    return counts
+
+
+@pytest.fixture(scope="module")
+def small_pool(players):
+    # Few enough players that some positions run out
+    return {position: dict(list(players[position].items())[:sizes])
+            for position, sizes in zip(POSITIONS, (5, 4, 12, 12))}
+
+
+@pytest.mark.parametrize("teams,roster", [
+    (3, {"QB": 1, "RB": 2, "WR": 2, "TE": 1, "FLEX": 1}),
+    (3, {"QB": 1, "RB": 2, "WR": 2, "TE": 1, "FLEX": 1, "SUPERFLEX": 1}),
+    (4, {"QB": 1, "RB": 1, "WR": 1, "TE": 1, "FLEX": 2, "SUPERFLEX": 2}),
+    (2, {"RB": 1, "SUPERFLEX": 3}),
+])
+def test_starters_match_a_greedy_fill(small_pool, teams, roster):
+    league = League("Test", teams, roster)
+    allocator = BaselineAllocator(small_pool)
+    assert allocator.starters(league) == greedy_starters(small_pool, league)
+    assert allocator.baseline(league) == {position: min(count, len(small_pool[position]) - 1)
+                                          for position, count in greedy_starters(small_pool, league).items()}
+
+
+@pytest.mark.parametrize("rounds", [1, 3, 9])
+def test_baseline_rounds_is_drafted_plus_one(players, rounds):
+    league = League("Test", 12, baseline_rounds=rounds)
+    baseline = BaselineAllocator(players).baseline(league)
+    for position in POSITIONS:
+        drafted = sum(1 for player in players[position].values()
+                      if player.overall_rank != -1 and player.overall_rank <= 12 * rounds)
+        assert baseline[position] == min(drafted + 1, len(players[position]) - 1)
+
+
+def test_parse_roster():
+    assert parse_roster("qb=1, RB=2,SUPERFLEX=1") == {"QB": 1, "RB": 2, "SUPERFLEX": 1}
+    for text in ("QB", "QB=x", "K=1"):
+        with pytest.raises(ValueError):
+            parse_roster(text)
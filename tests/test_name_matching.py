@@ -0,0 +1,77 @@
+import csv
+import difflib
+
+from name_matching import NameIndex, normalize_name
+
+PLATFORM_RANKINGS = {
+    "Ja'Marr Chase": (1, 1, "WR"),
+    "Marvin Harrison": (2, 2, "WR"),
+    "Gabriel Davis": (3, 3, "WR"),
+    "Mike Williams": (4, 4, "WR"),
+    "Josh Allen": (5, 1, "QB"),
+}
+
+
+def read_report(file_path):
+    with open(file_path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_normalize_name():
+    assert normalize_name("D.J. Moore Jr.") == normalize_name("DJ Moore") == "dj moore"
+    assert normalize_name("Amon-Ra St. Brown") == "amon ra st brown"
+    assert normalize_name("Kenneth Walker III") == "kenneth walker"
+
+
+def test_exact_and_normalized_matches():
+    index = NameIndex(PLATFORM_RANKINGS)
+    match = index.match("Josh Allen", "QB")
+    assert (match.platform_name, match.method) == ("Josh Allen", "exact")
+    # Suffix and punctuation
+    for name, platform_name in (("Marvin Harrison Jr.", "Marvin Harrison"), ("JaMarr Chase", "Ja'Marr Chase")):
+        match = index.match(name, "WR")
+        assert (match.platform_name, match.confidence, match.method) == (platform_name, 1.0, "normalized")
+        assert index.ranking(match) == PLATFORM_RANKINGS[platform_name]
+
+
+def test_fuzzy_match_needs_min_confidence():
+    ratio = difflib.SequenceMatcher(None, "gabe davis", "gabriel davis").ratio()
+    match = NameIndex(PLATFORM_RANKINGS, min_confidence=ratio).match("Gabe Davis", "WR")
+    assert (match.platform_name, match.confidence, match.method) == ("Gabriel Davis", ratio, "fuzzy")
+
+    index = NameIndex(PLATFORM_RANKINGS, min_confidence=ratio + 0.01)
+    match = index.match("Gabe Davis", "WR")
+    # The closest name is kept for the report, but not used
+    assert (match.platform_name, match.method) == ("Gabriel Davis", "missing")
+    assert index.ranking(match) == (-1, -1)
+
+
+def test_fuzzy_match_needs_the_same_position():
+    index = NameIndex(PLATFORM_RANKINGS)
+    assert index.match("Mikey Williams", "WR").method == "fuzzy"
+    assert index.match("Mikey Williams", "TE").method == "missing"
+    # Without positions on either side the name alone decides
+    assert index.match("Mikey Williams").method == "fuzzy"
+    assert NameIndex({"Mike Williams": (4, 4)}).match("Mikey Williams", "TE").method == "fuzzy"
+
+
+def test_report(tmp_path):
+    index = NameIndex(PLATFORM_RANKINGS)
+    index.match("Josh Allen", "QB")
+    missing = index.match("Nobody At All", "RB")
+    assert missing.method == "missing"
+    assert index.ranking(missing) == (-1, -1)
+    # Two projection names given the same platform player
+    index.match("Mike Williams", "WR")
+    index.match("Mikey Williams", "WR")
+
+    report_path = str(tmp_path / "name_matches.csv")
+    index.write_report(report_path)
+    rows = {row["Name"]: row for row in read_report(report_path)}
+    assert "Josh Allen" not in rows
+    assert rows["Nobody At All"]["Method"] == "missing"
+    assert rows["Nobody At All"]["Platform Name"] == ""
+    assert rows["Mike Williams"]["Shared With"] == "Mikey Williams"
+    assert rows["Mikey Williams"]["Shared With"] == "Mike Williams"
+    # Least confident first
+    assert list(rows)[0] == "Nobody At All"
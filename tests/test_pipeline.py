@@ -0,0 +1,106 @@
+import csv
+import os
+import shutil
+
+from main import StatColumns, load_platform_rankings, projection_records, rank_files
+from name_matching import NameIndex
+from rebuild_cache import BuildCache
+
+
+def run(data_dir, output_dir=None, **kwargs):
+    # rank_files over a made up dataset, the same way main.py calls it
+    platform_name, platform_rankings = load_platform_rankings(os.path.join(data_dir, "draft_platform_rankings"))
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    return rank_files(os.path.join(data_dir, "fp_data"), platform_name, NameIndex(platform_rankings), output_dir,
+                      **kwargs)[1]
+
+
+def read_outputs(output_dir):
+    outputs = {}
+    for f in sorted(os.listdir(output_dir)):
+        with open(os.path.join(output_dir, f), "rb") as file:
+            outputs[f] = file.read()
+    return outputs
+
+
+def test_workers_give_the_same_output(dataset, tmp_path):
+    rankings = run(dataset, str(tmp_path / "one"), workers=1)
+    assert sorted(read_outputs(str(tmp_path / "one"))) == ["Overall.csv", "QB.csv", "RB.csv", "TE.csv", "WR.csv"]
+    for workers in (2, 3):
+        assert run(dataset, str(tmp_path / str(workers)), workers=workers) == rankings
+        assert read_outputs(str(tmp_path / str(workers))) == read_outputs(str(tmp_path / "one"))
+
+
+class CountingCache(BuildCache):
+    # Counts the stages answered from the cache, so the tests know the incremental path actually ran
+    def __init__(self, cache_dir):
+        super().__init__(cache_dir)
+        self.hits = 0
+
+    def load(self, stage, key):
+        result = super().load(stage, key)
+        self.hits += result is not None
+        return result
+
+
+def test_incremental_rerun_matches_a_full_run(dataset, tmp_path):
+    data_dir = str(tmp_path / "data")
+    shutil.copytree(dataset, data_dir)
+    cache_dir = str(tmp_path / "cache")
+    run(data_dir, str(tmp_path / "first"), cache=CountingCache(cache_dir))
+
+    # The best WR gets more yards, which changes the WR sheet and Overall but none of the other positions
+    wr_file = os.path.join(data_dir, "fp_data", "FantasyPros_Projections_WR.csv")
+    with open(wr_file, newline="") as f:
+        rows = list(csv.reader(f))
+    column = rows[0].index("REC_YDS")
+    rows[2][column] = f"{float(rows[2][column].replace(',', '')) * 1.5:,.1f}"
+    with open(wr_file, "w", newline="") as f:
+        csv.writer(f).writerows(rows)
+
+    cache = CountingCache(cache_dir)
+    rankings = run(data_dir, str(tmp_path / "incremental"), cache=cache)
+    assert cache.hits == 3
+    assert rankings == run(data_dir, str(tmp_path / "full"))
+    assert read_outputs(str(tmp_path / "incremental")) == read_outputs(str(tmp_path / "full"))
+    assert read_outputs(str(tmp_path / "incremental")) != read_outputs(str(tmp_path / "first"))
+
+
+def read_records(file_path, reader, keep=None):
+    stat_columns = StatColumns()
+    return [(name, team, {tier: stat_columns.to_dict(row) if row is not None else None
+                          for tier, row in projections.items()}, stat_order)
+            for name, team, projections, stat_order in projection_records(file_path, stat_columns, reader, keep)]
+
+
+def test_readers_give_the_same_records(dataset, tmp_path, monkeypatch):
+    # The npy reader keeps its binary copies in .cache under the working folder
+    monkeypatch.chdir(tmp_path)
+    data_dir = os.path.join(dataset, "fp_data")
+    for f in sorted(os.listdir(data_dir)):
+        file_path = os.path.join(data_dir, f)
+        for keep in (None, 40):
+            records = read_records(file_path, "csv", keep)
+            assert len(records) == (300 if keep is None else keep)
+            # npy twice, the first time parses the file and stores it, the second loads the stored copy
+            for reader in ("pandas", "npy", "npy"):
+                assert read_records(file_path, reader, keep) == records
+    assert os.listdir(tmp_path / ".cache" / "projections")
+
+    # Spreadsheets save the empty rows at the bottom as a comma for every column
+    file_path = str(tmp_path / "FantasyPros_Projections_TE.csv")
+    with open(os.path.join(data_dir, "FantasyPros_Projections_TE.csv"), newline="") as f:
+        rows = list(csv.reader(f))
+    while not any(rows[-1]):
+        rows.pop()
+    with open(file_path, "w", newline="") as f:
+        csv.writer(f).writerows(rows + [[""] * len(rows[0])] * 3)
+    records = read_records(file_path, "csv")
+    assert records[-1][2]["low"] is not None
+    for reader in ("pandas", "npy", "npy"):
+        assert read_records(file_path, reader) == records
+
+    rankings = run(dataset)
+    for reader in ("pandas", "npy"):
+        assert run(dataset, reader=reader) == rankings
@@ -0,0 +1,51 @@
+import csv
+import os
+
+from main import HalfPPR, PPR, POSITIONS, Player, ProjectionMatrix, StatColumns, score_players
+
+
+def file_scores(file_path, scoring):
+    # Scores the way the original script worked them out: every row added up from left to right
+    scores = {}
+    with open(file_path, newline="") as f:
+        rows = list(csv.reader(f))
+    headers = rows[0]
+    name = None
+    for row in rows[2:]:
+        if not any(cell.strip() for cell in row):
+            continue
+        if row[0].strip():
+            name = row[0].strip()
+            scores[name] = []
+        score = 0
+        for header, value in zip(headers[2:], row[2:]):
+            if header != "FPTS" and value.strip():
+                score += float(value.replace(",", "")) * scoring.weights[header]
+        scores[name].append(score / 17)
+    return scores
+
+
+def test_scores_add_up_in_file_column_order(players, dataset):
+    pool = [player for position in POSITIONS for player in players[position].values()]
+    for scoring in (PPR, HalfPPR):
+        batched = score_players(pool, scoring)
+        for position in POSITIONS:
+            expected = file_scores(os.path.join(dataset, "fp_data", f"FantasyPros_Projections_{position}.csv"),
+                                   scoring)
+            for player in players[position].values():
+                average, high, low = expected[player.name]
+                assert batched[player] == (low, average, high)
+                # Scored one player at a time, or from the projections as a dict, the sum is the same
+                assert (scoring.score_row(player.projection_rows()[1], player.stat_columns, player.stat_order) ==
+                        scoring.score(player.average_projection) == average)
+
+
+def test_players_from_dicts_keep_their_stat_order():
+    stat_columns = StatColumns()
+    projections = {"REC": 81.3, "REC_YDS": 1045.7, "REC_TDS": 7.9, "FL": 0.7}
+    player = Player("A Player", "WR", "KC", (1, 1), stat_columns)
+    player.set_projections("average", projections)
+    assert player.stat_order == ("REC", "REC_YDS", "REC_TDS", "FL")
+    expected = PPR.score(projections)
+    assert player.get_score()[1] == expected
+    assert ProjectionMatrix([player]).score()[0, 1, 0] == expected
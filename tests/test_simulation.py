@@ -0,0 +1,16 @@
+import pytest
+
+from simulation import CHUNK_SIZE, simulate
+
+
+def test_workers_give_the_same_results(players):
+    # More than one chunk, so the workers really split the seasons
+    seasons = CHUNK_SIZE + 500
+    results = simulate(players, seasons=seasons, seed=3)
+    assert simulate(players, seasons=seasons, seed=3, workers=3) == results
+    assert simulate(players, seasons=seasons, seed=4) != results
+
+
+def test_needs_a_season(players):
+    with pytest.raises(ValueError):
+        simulate(players, seasons=0)